@@ -0,0 +1,72 @@
+# benchmarks/bench_alerts.py
+"""
+Перевірка курсу проти індексу порогових сповіщень (utils/alerts.py)
+у порівнянні з перебором усіх сповіщень.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_alerts [кількість сповіщень] [кількість оновлень курсу]
+"""
+
+import random
+import sys
+import time
+from utils.alerts import ABOVE, BELOW, CHANGE, Alert, AlertEngine
+
+PAIRS = [(currency, source) for currency in ("USD", "EUR", "GBP", "PLN") for source in ("NBU", "PrivatBank", "Monobank")]
+PAIRS.append(("USD", "Minfin"))
+BASE = {"USD": 41.0, "EUR": 44.5, "GBP": 52.0, "PLN": 10.4}
+
+
+def make_alerts(count, rng):
+    alerts = []
+    for alert_id in range(1, count + 1):
+        currency, source = rng.choice(PAIRS)
+        base = BASE[currency]
+        kind = rng.choice((ABOVE, BELOW, CHANGE))
+        if kind == CHANGE:
+            alerts.append(Alert(alert_id, alert_id, currency, source, kind, rng.uniform(0.5, 5), base))
+        else:
+            alerts.append(Alert(alert_id, alert_id, currency, source, kind, base * rng.uniform(0.9, 1.1), base))
+    return alerts
+
+
+def fires(alert, rate):
+    upper, lower = alert.bounds()
+    return (upper is not None and rate >= upper) or (lower is not None and rate <= lower)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(21)
+    alerts = make_alerts(count, rng)
+    # Курси повільно блукають навколо бази, як між реальними зборами
+    walk = [(pair, BASE[pair[0]] * (1 + rng.gauss(0, 0.003))) for pair in rng.choices(PAIRS, k=updates)]
+
+    started = time.perf_counter()
+    engine = AlertEngine()
+    engine.build(alerts)
+    print(f"Сповіщень: {count}, побудова індексу {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    started = time.perf_counter()
+    fired_index = sum(len(engine.match(currency, source, rate)) for (currency, source), rate in walk)
+    index_ms = (time.perf_counter() - started) * 1000
+
+    # Перебір: кожне оновлення перевіряє всі сповіщення (спрацьовані вилучаються так само)
+    active = set(alert.id for alert in alerts)
+    started = time.perf_counter()
+    fired_scan = 0
+    for pair, rate in walk:
+        for alert in alerts:
+            if alert.id in active and (alert.currency, alert.source) == pair and fires(alert, rate):
+                active.discard(alert.id)
+                fired_scan += 1
+    scan_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Оновлень курсу: {updates}")
+    print(f"  індекс:  {index_ms:9.1f} мс ({index_ms / updates:.3f} мс на оновлення), спрацювало {fired_index}")
+    print(f"  перебір: {scan_ms:9.1f} мс ({scan_ms / updates:.3f} мс на оновлення), спрацювало {fired_scan}")
+
+
+if __name__ == "__main__":
+    main()
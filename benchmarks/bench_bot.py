@@ -0,0 +1,276 @@
+# benchmarks/bench_bot.py
+"""
+Навантажувальний бенчмарк бота без мережі: фейкові API банків і Telegram
+(benchmarks/fakes.py), тимчасова SQLite-база і синтетичний потік апдейтів
+через Dispatcher з роутером handlers/user.py.
+
+Запуск з кореня репозиторію:
+    python -m benchmarks.bench_bot --updates 5000 --concurrency 50
+    python -m benchmarks.bench_bot --bank-latency 0.2 --failure-rate 0.3
+    python -m benchmarks.bench_bot --storage redis  # RedisStorage на fakeredis (pip install fakeredis)
+
+Звіт: p50/p99 часу обробки апдейтів (загалом і по командах), пропускна
+здатність, кількість і швидкість записів у БД, збір курсів і розсилка.
+Для порівняння змін запускайте з однаковим --seed.
+"""
+
+import os
+import tempfile
+
+# Тимчасова БД і фейковий токен мають бути задані до імпорту config
+_tmpdir = tempfile.TemporaryDirectory(prefix="currency-bench-")
+os.environ["DB_PATH"] = os.path.join(_tmpdir.name, "bench.db")
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import replace
+from datetime import datetime, timedelta
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from benchmarks.fakes import FakeBanks, FakeTelegram
+from db import storage
+from handlers import user
+from middlewares.stats import StatsMiddleware, stats
+from utils.breaker import get_breaker
+from utils.broadcast import RateLimiter, broadcast, render_daily_message
+from utils.http import close_session
+from utils.inline import inline_answers
+from utils.metrics import DB_QUERY_LATENCY, RATE_CHANGES, UPSTREAM_RESPONSES
+from utils.parsers import SOURCES, add_rate_listener, collect_source, register_source
+from utils.timeseries import store as timeseries
+
+# Синтетичний потік: (текст повідомлення, вага)
+UPDATE_MIX = [
+    ("/start", 5), ("/help", 3), ("/usd", 20), ("/eur", 10), ("/compare", 12),
+    ("/compare EUR", 5), ("/history", 8), ("/history EUR 1y", 2), ("/chart", 4), ("/chart 5y", 1),
+    ("/stats", 2), ("/stats EUR 1y", 1),
+    ("@", 6), ("@usd", 10), ("@eur privat", 4), ("@100 usd", 4),  # Інлайн-запити (@bot ...)
+    ("/subscribe", 5), ("/unsubscribe", 3), ("USD", 10), ("PLN", 5), ("hello", 2),
+]
+DB_WRITE_FUNCTIONS = ["add_rates", "add_subscriber", "remove_subscriber", "add_command_stats"]
+HISTORY_DAYS = 5 * 365
+
+
+def percentile(values, p):
+    """Перцентиль p (0..100) відсортованого списку методом найближчого рангу."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def make_update(update_id, user_id, text):
+    """Сирий апдейт у форматі Telegram (як приходить у вебхук); текст з @ — інлайн-запит."""
+    if text.startswith("@"):
+        return {"update_id": update_id, "inline_query": {
+            "id": str(update_id),
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "query": text[1:],
+            "offset": "",
+        }}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+def db_writes():
+    """Знімок {функція: (кількість викликів, сумарний час)} для записів у БД."""
+    return {name: DB_QUERY_LATENCY.summary(function=name) for name in DB_WRITE_FUNCTIONS}
+
+
+async def seed_history():
+    """Історія курсів НБУ за HISTORY_DAYS днів, щоб /history і /chart мали дані."""
+    today = datetime.now()
+    rows = []
+    for days_ago in range(1, HISTORY_DAYS + 1):
+        day = (today - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+        rows.append((day, "USD", "NBU", 41.0 - days_ago / 200))
+        rows.append((day, "EUR", "NBU", 44.5 - days_ago / 200))
+    await storage.add_rates(rows)
+
+
+async def bench_collect(rounds):
+    """Збір курсів з усіх джерел rounds разів поспіль."""
+    timings = defaultdict(list)
+    saved = 0
+
+    async def collect(name):
+        started = time.perf_counter()
+        snapshot = await collect_source(name)
+        timings[name].append(time.perf_counter() - started)
+        return len(snapshot.rates) if snapshot else 0
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        saved += sum(await asyncio.gather(*(collect(name) for name in SOURCES)))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n== Збір курсів: {rounds} раундів за {elapsed:.2f} с, отримано {saved} курсів")
+    for name, values in timings.items():
+        values.sort()
+        responses = {
+            result: int(UPSTREAM_RESPONSES.value(source=name, result=result))
+            for result in ("changed", "not_modified", "same_hash")
+        }
+        print(
+            f"  {name:<12} p50 {percentile(values, 50) * 1000:8.1f} мс  "
+            f"p99 {percentile(values, 99) * 1000:8.1f} мс  запобіжник: {get_breaker(name).state}  "
+            f"відповіді: {responses}, записано змін: {int(RATE_CHANGES.value(source=name))}"
+        )
+
+
+async def bench_updates(dp, bot, count, concurrency, users, rng):
+    """Проганяє count апдейтів через Dispatcher з concurrency паралельними обробниками."""
+    texts, weights = zip(*UPDATE_MIX)
+    queue = asyncio.Queue()
+    for update_id in range(1, count + 1):
+        text = rng.choices(texts, weights)[0]
+        queue.put_nowait((text, make_update(update_id, rng.randint(1, users), text)))
+    latencies = defaultdict(list)
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            text, update = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await dp.feed_raw_update(bot, update)
+            except Exception as e:
+                errors += 1
+                print(f"Помилка обробки {text}: {e}")
+            latencies[text].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    overall = sorted(value for values in latencies.values() for value in values)
+    print(
+        f"\n== Апдейти: {count} за {elapsed:.2f} с ({count / elapsed:.0f} апдейтів/с), "
+        f"паралельно {concurrency}, помилок {errors}"
+    )
+    print(f"  {'всього':<16} p50 {percentile(overall, 50) * 1000:8.2f} мс  p99 {percentile(overall, 99) * 1000:8.2f} мс")
+    for command, values in sorted(latencies.items()):
+        values.sort()
+        print(
+            f"  {command:<16} p50 {percentile(values, 50) * 1000:8.2f} мс  "
+            f"p99 {percentile(values, 99) * 1000:8.2f} мс  ({len(values)})"
+        )
+    return elapsed
+
+
+async def bench_broadcast(bot, telegram, subscribers, rate, workers):
+    """Розсилка subscribers підписникам через фейковий Telegram."""
+    for user_id in range(1_000_000, 1_000_000 + subscribers):
+        await storage.add_subscriber(user_id)
+    text = await render_daily_message()
+    sent_before = sum(telegram.messages.values())
+    started = time.perf_counter()
+    result = await broadcast(bot, text, limiter=RateLimiter(rate), workers=workers)
+    elapsed = time.perf_counter() - started
+    delivered = sum(telegram.messages.values()) - sent_before
+    print(
+        f"\n== Розсилка: {result} за {elapsed:.2f} с "
+        f"({delivered / elapsed:.0f} повідомлень/с, ліміт {rate:g}/с)"
+    )
+
+
+def report_db_writes(before, elapsed):
+    after = db_writes()
+    print(f"\n== Записи в БД за {elapsed:.2f} с")
+    for name in DB_WRITE_FUNCTIONS:
+        calls = after[name][0] - before[name][0]
+        seconds = after[name][1] - before[name][1]
+        if calls:
+            print(
+                f"  {name:<18} {calls:7d} викликів  {calls / elapsed:8.0f}/с  "
+                f"в середньому {seconds / calls * 1000:.3f} мс"
+            )
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    banks = await FakeBanks(
+        change_rate=args.change_rate, latency=args.bank_latency, failure_rate=args.failure_rate, seed=args.seed,
+    ).start()
+    telegram = await FakeTelegram(latency=args.telegram_latency, seed=args.seed).start()
+    for name in list(SOURCES):
+        register_source(replace(SOURCES[name], url=banks.url_for(name)))
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(telegram.url))
+    bot = Bot(token=os.environ["BOT_TOKEN"], session=session)
+    dp = Dispatcher()
+    dp.include_router(user.router)
+    dp.message.middleware(StatsMiddleware(stats))
+    dp.inline_query.middleware(StatsMiddleware(stats))
+
+    if args.storage == "redis":
+        # Той самий RedisStorage, що й у продакшні, але з Redis у пам'яті процесу
+        from fakeredis import FakeServer
+        from fakeredis.aioredis import FakeRedis
+        storage.set_storage(storage.RedisStorage(FakeRedis(server=FakeServer(), decode_responses=True)))
+    await storage.init()
+    try:
+        await seed_history()
+        await timeseries.load()
+        add_rate_listener(timeseries.on_snapshot)
+        await inline_answers.refresh()
+        add_rate_listener(inline_answers.on_snapshot)
+        started = time.perf_counter()
+        before = db_writes()
+        await bench_collect(args.rounds)
+        await bench_updates(dp, bot, args.updates, args.concurrency, args.users, rng)
+        await stats.flush()
+        if args.storage == "sqlite":  # DB_QUERY_LATENCY вимірює лише функції db/queries.py
+            report_db_writes(before, time.perf_counter() - started)
+        if args.subscribers:
+            await bench_broadcast(bot, telegram, args.subscribers, args.broadcast_rate, args.concurrency)
+        print(f"\nЗапитів до банків: {dict(banks.requests)}, відмов: {dict(banks.failures)}")
+        print(f"Викликів Telegram API: {sum(telegram.requests.values())}")
+    finally:
+        await session.close()
+        await close_session()
+        await storage.close()
+        await banks.stop()
+        await telegram.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк бота на фейкових API")
+    parser.add_argument("--updates", type=int, default=2000, help="кількість синтетичних апдейтів")
+    parser.add_argument("--concurrency", type=int, default=20, help="паралельних обробників")
+    parser.add_argument("--users", type=int, default=500, help="розмір пулу користувачів")
+    parser.add_argument("--rounds", type=int, default=5, help="раундів збору курсів")
+    parser.add_argument("--bank-latency", type=float, default=0.05, help="середня затримка API банків, с")
+    parser.add_argument("--change-rate", type=float, default=0.3, help="ймовірність, що курси банку змінились")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="частка відповідей 503 від банків")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="середня затримка Telegram API, с")
+    parser.add_argument("--subscribers", type=int, default=1000, help="підписників для розсилки (0 — пропустити)")
+    parser.add_argument("--broadcast-rate", type=float, default=1000, help="ліміт розсилки, повідомлень/с")
+    parser.add_argument("--storage", choices=("sqlite", "redis"), default="sqlite",
+                        help="сховище: тимчасова SQLite-база або RedisStorage на fakeredis")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    finally:
+        _tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
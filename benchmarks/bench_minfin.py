@@ -0,0 +1,93 @@
+# benchmarks/bench_minfin.py
+"""
+Порівняння розбору сторінки Мінфіну: повне DOM-дерево BeautifulSoup
+проти потокового екстрактора utils/minfin.py на збереженій сторінці.
+
+Збережіть живу сторінку і запустіть з кореня репозиторію:
+    curl -A "Mozilla/5.0" --create-dirs -o benchmarks/fixtures/minfin.html https://minfin.com.ua/ua/currency/usd/
+    python -m benchmarks.bench_minfin [шлях до HTML] [кількість повторів]
+
+Якщо bs4 встановлено, результат екстрактора звіряється зі старим розбором;
+розбіжність означає, що змінилась верстка, і бенчмарк завершується з кодом 1.
+"""
+
+import codecs
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from utils.minfin import MinfinExtractor, extract_rates
+
+FIXTURE = Path(__file__).parent / "fixtures" / "minfin.html"
+CURRENCY = "USD"
+CHUNK_SIZE = 16384  # Як utils.http.STREAM_CHUNK_SIZE
+
+
+def parse_bs4(html):
+    """Старий підхід (get_usd_minfin): повне дерево html.parser і перший div sc-1x32wa2-9."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    tag = soup.find("div", class_="sc-1x32wa2-9")
+    if not tag:
+        return {}
+    return {CURRENCY: float(tag.find(string=True).strip().replace(",", "."))}
+
+
+def parse_stream(html):
+    return extract_rates(html, CURRENCY, CHUNK_SIZE)
+
+
+def measure(func, html, repeat):
+    """Повертає (результат, мс CPU на виклик, пік пам'яті у КБ)."""
+    result = func(html)  # Прогрів: імпорти і компіляція регулярних виразів
+    started = time.process_time()
+    for _ in range(repeat):
+        func(html)
+    cpu_ms = (time.process_time() - started) * 1000 / repeat
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, cpu_ms, peak / 1024
+
+
+def consumed_bytes(html):
+    """Скільки байтів сторінки потрібно прочитати, поки екстрактор не знайде всі курси."""
+    extractor = MinfinExtractor(CURRENCY)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    data = html.encode("utf-8")
+    for start in range(0, len(data), CHUNK_SIZE):
+        if extractor.feed(decoder.decode(data[start:start + CHUNK_SIZE])):
+            return min(start + CHUNK_SIZE, len(data))
+    return len(data)
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else FIXTURE
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    if not path.exists():
+        print(f"Немає збереженої сторінки {path}. Завантажте її командою з опису модуля.")
+        sys.exit(2)
+    html = path.read_text(encoding="utf-8")
+    print(f"Сторінка: {path} ({len(html.encode('utf-8')) // 1024} КБ), повторів: {repeat}")
+
+    parsers = [("stream", parse_stream)]
+    try:
+        import bs4  # noqa: F401
+        parsers.insert(0, ("bs4", parse_bs4))
+    except ImportError:
+        print("bs4 не встановлено — порівняння лише для потокового екстрактора")
+
+    results = {}
+    for name, func in parsers:
+        rates, cpu_ms, peak_kb = measure(func, html, repeat)
+        results[name] = rates
+        print(f"{name:>8}: {cpu_ms:8.2f} мс CPU, пік пам'яті {peak_kb:9.1f} КБ, {rates}")
+    print(f"Потоковому екстрактору достатньо {consumed_bytes(html) // 1024} КБ сторінки")
+    if not results["stream"] or ("bs4" in results and results["bs4"] != results["stream"]):
+        print("❌ Екстрактор не знайшов курс або розійшовся з BeautifulSoup — перевірте верстку сторінки")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
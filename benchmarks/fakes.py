@@ -0,0 +1,177 @@
+# benchmarks/fakes.py
+"""
+Локальні замінники зовнішніх сервісів для бенчмарків:
+API НБУ, ПриватБанку, Monobank, сторінка Мінфіну і Telegram Bot API.
+Кожен сервер додає затримку і з заданою ймовірністю відповідає 503.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from aiohttp import web
+
+# Мінімальна сторінка валюти Мінфіну: лише маркер курсу, який шукає utils/minfin.py
+MINFIN_PAGE = '<!DOCTYPE html><html lang="uk"><body><div class="sc-1x32wa2-9 bKmKjX">{rate}</div></body></html>'
+
+# Базові курси, навколо яких генеруються відповіді банків
+BASE_RATES = {"USD": 41.2, "EUR": 44.9, "GBP": 52.4, "PLN": 10.5, "CHF": 46.8, "CZK": 1.8}
+ISO_CODES = {"USD": 840, "EUR": 978, "GBP": 826, "PLN": 985, "CHF": 756, "CZK": 203}
+
+
+class FakeServer:
+    """
+    Базовий aiohttp-сервер на 127.0.0.1 з випадковим портом.
+    latency — середня затримка відповіді (секунди, експоненційний розподіл)
+    failure_rate — частка запитів, на які сервер відповідає 503
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = Counter()  # route -> кількість запитів
+        self.failures = Counter()
+        self.app = web.Application(middlewares=[self._chaos])
+        self._runner = None
+        self.url = None
+
+    @web.middleware
+    async def _chaos(self, request, handler):
+        route = request.match_info.route.name or request.path
+        self.requests[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.random.expovariate(1 / self.latency))
+        if self.random.random() < self.failure_rate:
+            self.failures[route] += 1
+            return web.Response(status=503, text="Service Unavailable")
+        return await handler(request)
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class FakeBanks(FakeServer):
+    """
+    Відповіді у форматах реальних джерел курсів (utils/parsers.py).
+    change_rate — ймовірність, що курси джерела змінились з попереднього запиту;
+    інакше віддається те саме тіло. НБУ надсилає ETag і відповідає 304 на
+    If-None-Match, Мінфін — Last-Modified, банки — лише тіло (перевіряється хеш).
+    """
+
+    ROUTES = {"NBU": "/nbu", "PrivatBank": "/privat", "Monobank": "/mono", "Minfin": "/minfin"}
+    MINFIN_MODIFIED = "Mon, 06 Jan 2025 10:00:00 GMT"
+
+    def __init__(self, change_rate=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.change_rate = change_rate
+        self.minfin_html = MINFIN_PAGE.format(rate=str(BASE_RATES["USD"]).replace(".", ",")).encode()
+        self.not_modified = Counter()  # route -> кількість відповідей 304
+        self._bodies = {}  # route -> останнє тіло JSON
+        self.app.router.add_get("/nbu", self.nbu, name="NBU")
+        self.app.router.add_get("/privat", self.privat, name="PrivatBank")
+        self.app.router.add_get("/mono", self.mono, name="Monobank")
+        self.app.router.add_get("/minfin", self.minfin, name="Minfin")
+
+    def url_for(self, source_name):
+        return self.url + self.ROUTES[source_name]
+
+    def _rate(self, currency):
+        return round(BASE_RATES[currency] * self.random.uniform(0.99, 1.01), 4)
+
+    def _body(self, route, build):
+        """Тіло відповіді: нове з імовірністю change_rate, інакше попереднє."""
+        if route not in self._bodies or self.random.random() < self.change_rate:
+            self._bodies[route] = json.dumps(build()).encode()
+        return self._bodies[route]
+
+    async def nbu(self, request):
+        today = datetime.now().strftime("%d.%m.%Y")
+        body = self._body("NBU", lambda: [
+            {"r030": ISO_CODES[cc], "txt": cc, "rate": self._rate(cc), "cc": cc, "exchangedate": today}
+            for cc in BASE_RATES
+        ])
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified["NBU"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    async def privat(self, request):
+        body = self._body("PrivatBank", lambda: [
+            {"ccy": cc, "base_ccy": "UAH", "buy": str(self._rate(cc) - 0.3), "sale": str(self._rate(cc))}
+            for cc in ("USD", "EUR")
+        ])
+        return web.Response(body=body, content_type="application/json")
+
+    async def mono(self, request):
+        now = int(time.time())
+        body = self._body("Monobank", lambda: [
+            {"currencyCodeA": ISO_CODES[cc], "currencyCodeB": 980, "date": now,
+             "rateBuy": self._rate(cc) - 0.3, "rateSell": self._rate(cc)}
+            for cc in BASE_RATES
+        ])
+        return web.Response(body=body, content_type="application/json")
+
+    async def minfin(self, request):
+        if request.headers.get("If-Modified-Since") == self.MINFIN_MODIFIED:
+            self.not_modified["Minfin"] += 1
+            return web.Response(status=304)
+        return web.Response(
+            body=self.minfin_html, content_type="text/html", charset="utf-8",
+            headers={"Last-Modified": self.MINFIN_MODIFIED},
+        )
+
+
+class FakeTelegram(FakeServer):
+    """
+    Мінімальний Telegram Bot API: приймає будь-який метод і повертає правдоподібний результат.
+    Бот підключається через TelegramAPIServer.from_base(fake.url).
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = Counter()  # chat_id -> кількість повідомлень
+        self.uploaded_bytes = 0
+        self._message_ids = itertools.count(1)
+        self.app.router.add_post("/bot{token}/{method}", self.handle, name="telegram")
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        form = await request.post()
+        if method in ("sendMessage", "sendPhoto"):
+            chat_id = int(form["chat_id"])
+            self.messages[chat_id] += 1
+            result = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+            }
+            if method == "sendPhoto":
+                photo = form.get("photo")
+                if hasattr(photo, "file"):
+                    self.uploaded_bytes += len(photo.file.read())
+                result["photo"] = [{"file_id": "fake", "file_unique_id": "fake", "width": 800, "height": 400}]
+                result["caption"] = form.get("caption", "")
+            else:
+                result["text"] = form.get("text", "")
+            return web.json_response({"ok": True, "result": result})
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {
+                "id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+            }})
+        return web.json_response({"ok": True, "result": True})
@@ -10,4 +10,51 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")  # Токен Telegram-бота
 ADMIN_ID = int(os.getenv("ADMIN_ID", "0"))  # ID адміністратора
 
 # Назва файлу бази даних
-DB_PATH = "db/currency.db"  # Шлях до бази даних SQLite
+DB_PATH = os.getenv("DB_PATH", "db/currency.db")  # Шлях до бази даних SQLite
+
+FAILURE_TTL = 30  # Скільки секунд кешувати невдалий результат (utils/cache.TTLCache)
+
+# Інтервали фонового збору курсів для кожного джерела (секунди)
+COLLECT_INTERVALS = {
+    "NBU": 3600,  # НБУ публікує курс раз на день
+    "PrivatBank": 300,
+    "Monobank": 300,  # Monobank жорстко обмежує частоту запитів
+    "Minfin": 600,
+}
+DEFAULT_COLLECT_INTERVAL = 300  # Для джерел, яких немає в COLLECT_INTERVALS
+
+STATS_FLUSH_INTERVAL = 60  # Як часто скидати статистику команд у БД (секунди)
+
+# Щоденна розсилка підписникам
+BROADCAST_TIME = os.getenv("BROADCAST_TIME", "09:00")  # Час розсилки (ГГ:ХХ)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))  # Повідомлень на секунду (ліміт Telegram ~30)
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "16"))  # Кількість паралельних відправників
+
+# Режим роботи: "polling" (за замовчуванням) або "webhook"
+RUN_MODE = os.getenv("RUN_MODE", "polling")
+WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")  # HTTP-сервер для вебхука і health-check
+WEB_PORT = int(os.getenv("WEB_PORT", "8080"))
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")  # Публічна адреса бота, напр. https://bot.example.com
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")  # Перевіряється в заголовку X-Telegram-Bot-Api-Secret-Token
+
+# Сховище стану: "sqlite" (одна репліка) або "redis" (спільне для кількох реплік)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Запобіжник (circuit breaker) для джерел курсів
+BREAKER_FAILURE_THRESHOLD = 3  # Невдач поспіль до відкриття
+BREAKER_BASE_DELAY = 60  # Перша пауза перед пробним запитом (секунди)
+BREAKER_MAX_DELAY = 3600  # Максимальна пауза між пробами (секунди)
+
+# Завантаження історичних курсів (python main.py --backfill / --import)
+BACKFILL_CONCURRENCY = 8  # Одночасних запитів до API НБУ
+BACKFILL_BATCH_DAYS = 60  # Днів в одній транзакції запису
+IMPORT_BATCH_SIZE = 10000  # Рядків дампу в одній транзакції запису
+
+# Порогові сповіщення про курс (/alert)
+ALERTS_PER_USER = 20  # Максимум активних сповіщень одного користувача
+ALERT_BATCH_SIZE = 500  # Скільки сповіщень надсилати одним пакетом
+
+# Інлайн-режим (@bot usd)
+INLINE_CACHE_TIME = 60  # Скільки секунд Telegram кешує відповідь на однаковий запит (для всіх користувачів)
@@ -0,0 +1,69 @@
+# db/aio.py
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from db import queries
+from utils.metrics import DB_QUERY_LATENCY
+
+# Уся робота з SQLite виконується в одному виділеному потоці,
+# тому event loop ніколи не чекає на диск
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+
+async def run_db(func, *args, **kwargs):
+    """Виконує синхронну функцію з db.queries у потоці БД."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def _timed(func):
+    # Вимірюється лише виконання в потоці БД, без очікування в черзі
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        with DB_QUERY_LATENCY.time(function=func.__name__):
+            return func(*args, **kwargs)
+    return timed
+
+
+def _to_async(func):
+    timed = _timed(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(timed, *args, **kwargs)
+    return wrapper
+
+
+# --- Асинхронні версії запитів з db/queries.py ---
+init_db = _to_async(queries.init_db)
+add_rate = _to_async(queries.add_rate)
+add_rates = _to_async(queries.add_rates)
+get_latest_rate = _to_async(queries.get_latest_rate)
+get_history = _to_async(queries.get_history)
+get_rate_dates = _to_async(queries.get_rate_dates)
+get_rollup = _to_async(queries.get_rollup)
+get_rates_since = _to_async(queries.get_rates_since)
+get_rates_watermark = _to_async(queries.get_rates_watermark)
+get_rate_writes = _to_async(queries.get_rate_writes)
+add_subscriber = _to_async(queries.add_subscriber)
+remove_subscriber = _to_async(queries.remove_subscriber)
+get_subscribers = _to_async(queries.get_subscribers)
+get_subscribers_page = _to_async(queries.get_subscribers_page)
+count_subscribers = _to_async(queries.count_subscribers)
+add_alert = _to_async(queries.add_alert)
+remove_alert = _to_async(queries.remove_alert)
+get_user_alerts = _to_async(queries.get_user_alerts)
+get_active_alerts = _to_async(queries.get_active_alerts)
+get_alerts = _to_async(queries.get_alerts)
+update_fired_alerts = _to_async(queries.update_fired_alerts)
+add_command_stats = _to_async(queries.add_command_stats)
+get_all_stats = _to_async(queries.get_all_stats)
+get_daily_stats = _to_async(queries.get_daily_stats)
+get_latency_stats = _to_async(queries.get_latency_stats)
+
+
+async def close_db():
+    """Закриває з'єднання і зупиняє потік БД."""
+    await run_db(queries.close_connection)
+    _executor.shutdown(wait=True)
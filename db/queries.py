@@ -1,9 +1,21 @@
 # db/queries.py
 
 import sqlite3
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import date as date_cls, datetime, timedelta
 from config import DB_PATH
 
+# --- Налаштування з'єднання SQLite ---
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",  # Читачі не блокують запис
+    "PRAGMA synchronous = NORMAL",  # У режимі WAL безпечно і значно швидше за FULL
+    "PRAGMA cache_size = -16000",  # ~16 МБ кешу сторінок
+    "PRAGMA mmap_size = 268435456",  # 256 МБ файлу читаються через mmap
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+]
+
 # --- SQL-запити як константи ---
 SQL_CREATE_RATES = """
     CREATE TABLE IF NOT EXISTS rates (
@@ -26,9 +38,36 @@ SQL_CREATE_STATS = """
         count INTEGER DEFAULT 0
     )
 """
+SQL_CREATE_RATES_UNIQUE = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_rates_unique
+    ON rates (date, currency, source)
+"""
+SQL_CREATE_RATES_LOOKUP = """
+    CREATE INDEX IF NOT EXISTS idx_rates_lookup
+    ON rates (currency, source, date, rate)
+"""
+SQL_DEDUPLICATE_RATES = """
+    DELETE FROM rates WHERE id NOT IN (
+        SELECT MAX(id) FROM rates GROUP BY date, currency, source
+    )
+"""
+# written — наскрізний номер запису: новий і перезаписаний курс отримують наступний номер
 SQL_INSERT_RATE = """
-    INSERT INTO rates (date, currency, source, rate)
-    VALUES (?, ?, ?, ?)
+    INSERT INTO rates (date, currency, source, rate, written)
+    VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(written), 0) + 1 FROM rates))
+    ON CONFLICT(date, currency, source) DO UPDATE SET rate = excluded.rate, written = excluded.written
+"""
+SQL_ADD_RATES_WRITTEN = "ALTER TABLE rates ADD COLUMN written INTEGER NOT NULL DEFAULT 0"
+SQL_INIT_RATES_WRITTEN = "UPDATE rates SET written = id"
+SQL_CREATE_RATES_WRITTEN = """
+    CREATE INDEX IF NOT EXISTS idx_rates_written
+    ON rates (written)
+"""
+SQL_SELECT_RATES_WATERMARK = "SELECT COALESCE(MAX(written), 0) FROM rates"
+SQL_SELECT_RATE_WRITES = """
+    SELECT written, date, currency, source, rate FROM rates
+    WHERE written > ?
+    ORDER BY written
 """
 SQL_SELECT_LATEST_RATE = """
     SELECT rate, date FROM rates
@@ -42,54 +81,386 @@ SQL_SELECT_HISTORY = """
     ORDER BY date DESC
     LIMIT ?
 """
+SQL_SELECT_RATE_DATES = """
+    SELECT date FROM rates
+    WHERE currency = ? AND source = ? AND date BETWEEN ? AND ?
+"""
+SQL_CREATE_ROLLUP = """
+    CREATE TABLE IF NOT EXISTS rates_rollup (
+        period TEXT NOT NULL,
+        currency TEXT NOT NULL,
+        source TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        open_date TEXT NOT NULL,
+        open REAL NOT NULL,
+        close_date TEXT NOT NULL,
+        close REAL NOT NULL,
+        low REAL NOT NULL,
+        high REAL NOT NULL,
+        total REAL NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (period, currency, source, bucket)
+    ) WITHOUT ROWID
+"""
+ROLLUP_PERIODS = ("day", "week", "month")
+# Перший день наступного інтервалу агрегації для інтервалу, що починається з :bucket
+ROLLUP_NEXT = {
+    "day": "date(:bucket, '+1 day')",
+    "week": "date(:bucket, '+7 days')",
+    "month": "date(:bucket, '+1 month')",
+}
+ROLLUP_RANGE = "currency = :currency AND source = :source AND date >= :bucket AND date < {next}"
+# Агрегат інтервалу перераховується з rates, а не доповнюється новим спостереженням:
+# rates — upsert за днем, тож повторний запис того самого дня не рахується двічі.
+# Інтервал — не більше 31 рядка, що читаються покривним індексом idx_rates_lookup.
+SQL_REBUILD_ROLLUP = """
+    INSERT INTO rates_rollup
+        (period, currency, source, bucket, open_date, open, close_date, close, low, high, total, count)
+    SELECT :period, :currency, :source, :bucket,
+        first.date, first.rate, last.date, last.rate, agg.low, agg.high, agg.total, agg.count
+    FROM
+        (SELECT MIN(rate) AS low, MAX(rate) AS high, SUM(rate) AS total, COUNT(*) AS count
+         FROM rates WHERE {range}) AS agg,
+        (SELECT date, rate FROM rates WHERE {range} ORDER BY date LIMIT 1) AS first,
+        (SELECT date, rate FROM rates WHERE {range} ORDER BY date DESC LIMIT 1) AS last
+    WHERE agg.count > 0
+    ON CONFLICT(period, currency, source, bucket) DO UPDATE SET
+        open_date = excluded.open_date,
+        open = excluded.open,
+        close_date = excluded.close_date,
+        close = excluded.close,
+        low = excluded.low,
+        high = excluded.high,
+        total = excluded.total,
+        count = excluded.count
+"""
+SQL_REBUILD_ROLLUPS = {
+    period: SQL_REBUILD_ROLLUP.format(range=ROLLUP_RANGE.format(next=next_bucket))
+    for period, next_bucket in ROLLUP_NEXT.items()
+}
+SQL_DELETE_ROLLUPS = "DELETE FROM rates_rollup"
+SQL_SELECT_ROLLUP = """
+    SELECT bucket, open, close, low, high, total, count FROM rates_rollup
+    WHERE period = ? AND currency = ? AND source = ? AND bucket >= ?
+    ORDER BY bucket
+"""
+SQL_SELECT_ALL_RATES = """
+    SELECT date, currency, source, rate FROM rates ORDER BY date, id
+"""
+SQL_SELECT_RATES_SINCE = """
+    SELECT date, currency, source, rate FROM rates
+    WHERE date >= ?
+    ORDER BY date
+"""
 SQL_INSERT_SUBSCRIBER = """
     INSERT OR IGNORE INTO subscribers (user_id, subscribed)
     VALUES (?, 1)
 """
+SQL_RESUBSCRIBE = """
+    INSERT INTO subscribers (user_id, subscribed)
+    VALUES (?, 1)
+    ON CONFLICT(user_id) DO UPDATE SET subscribed = 1
+"""
 SQL_UPDATE_UNSUBSCRIBE = """
     UPDATE subscribers SET subscribed = 0 WHERE user_id = ?
 """
 SQL_SELECT_SUBSCRIBERS = """
     SELECT user_id FROM subscribers WHERE subscribed = 1
 """
-SQL_INCREMENT_COMMAND_STAT = """
-    INSERT INTO stats (command, count) VALUES (?, 1)
-    ON CONFLICT(command) DO UPDATE SET count = count + 1
+SQL_SELECT_SUBSCRIBERS_PAGE = """
+    SELECT user_id FROM subscribers
+    WHERE subscribed = 1 AND user_id > ?
+    ORDER BY user_id
+    LIMIT ?
+"""
+SQL_COUNT_SUBSCRIBERS = """
+    SELECT COUNT(*) FROM subscribers WHERE subscribed = 1
+"""
+SQL_CREATE_ALERTS = """
+    CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        currency TEXT NOT NULL,
+        source TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        threshold REAL NOT NULL,
+        base_rate REAL,
+        active INTEGER DEFAULT 1
+    )
+"""
+SQL_CREATE_ALERTS_USER = """
+    CREATE INDEX IF NOT EXISTS idx_alerts_user ON alerts (user_id, active)
+"""
+SQL_INSERT_ALERT = """
+    INSERT INTO alerts (user_id, currency, source, kind, threshold, base_rate)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+SQL_DEACTIVATE_USER_ALERT = """
+    UPDATE alerts SET active = 0 WHERE id = ? AND user_id = ? AND active = 1
+"""
+SQL_DEACTIVATE_ALERT = """
+    UPDATE alerts SET active = 0 WHERE id = ?
+"""
+SQL_REARM_ALERT = """
+    UPDATE alerts SET base_rate = ? WHERE id = ?
+"""
+SQL_SELECT_USER_ALERTS = """
+    SELECT id, user_id, currency, source, kind, threshold, base_rate FROM alerts
+    WHERE user_id = ? AND active = 1
+    ORDER BY id
+"""
+SQL_SELECT_ACTIVE_ALERT = """
+    SELECT id, user_id, currency, source, kind, threshold, base_rate FROM alerts
+    WHERE id = ? AND active = 1
+"""
+SQL_SELECT_ACTIVE_ALERTS = """
+    SELECT id, user_id, currency, source, kind, threshold, base_rate FROM alerts
+    WHERE active = 1
+"""
+SQL_CREATE_STATS_DAILY = """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        command TEXT NOT NULL,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (day, command)
+    )
+"""
+SQL_CREATE_STATS_LATENCY = """
+    CREATE TABLE IF NOT EXISTS stats_latency (
+        command TEXT NOT NULL,
+        bucket REAL NOT NULL,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (command, bucket)
+    )
+"""
+SQL_ADD_COMMAND_STAT = """
+    INSERT INTO stats (command, count) VALUES (?, ?)
+    ON CONFLICT(command) DO UPDATE SET count = count + excluded.count
+"""
+SQL_ADD_DAILY_STAT = """
+    INSERT INTO stats_daily (day, command, count) VALUES (?, ?, ?)
+    ON CONFLICT(day, command) DO UPDATE SET count = count + excluded.count
+"""
+SQL_ADD_LATENCY_STAT = """
+    INSERT INTO stats_latency (command, bucket, count) VALUES (?, ?, ?)
+    ON CONFLICT(command, bucket) DO UPDATE SET count = count + excluded.count
 """
 SQL_SELECT_ALL_STATS = """
     SELECT command, count FROM stats
 """
+SQL_SELECT_DAILY_STATS = """
+    SELECT command, count FROM stats_daily WHERE day = ?
+"""
+SQL_SELECT_LATENCY_STATS = """
+    SELECT command, bucket, count FROM stats_latency ORDER BY command, bucket
+"""
+
 
+# Одне довготривале з'єднання на процес; доступ до нього серіалізує _lock
+_connection = None
+_lock = threading.RLock()
 
+
+def _open_connection():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+@contextmanager
 def get_connection():
-    # Створює нове з'єднання з SQLite-базою для кожного запиту
-    return sqlite3.connect(DB_PATH)
+    """
+    Видає спільне з'єднання з SQLite під блокуванням.
+    Після блоку with транзакція фіксується, а при помилці — відкочується.
+    """
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = _open_connection()
+        try:
+            yield _connection
+            _connection.commit()
+        except Exception:
+            _connection.rollback()
+            raise
+
+
+def close_connection():
+    """Закриває спільне з'єднання (викликається при зупинці бота)."""
+    global _connection
+    with _lock:
+        if _connection is not None:
+            _connection.close()
+            _connection = None
 
 
 def init_db():
-    """Створює всі необхідні таблиці, якщо їх ще немає."""
+    """Створює всі необхідні таблиці, якщо їх ще немає. Повертає True, якщо схема готова."""
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(SQL_CREATE_RATES)
             cursor.execute(SQL_CREATE_SUBSCRIBERS)
             cursor.execute(SQL_CREATE_STATS)
+            apply_migrations(cursor)
             conn.commit()
+            return True
     except Exception as e:
         print(f"Помилка ініціалізації БД: {e}")
+        return False
+
+
+# --- Міграції схеми ---
+# Кожна міграція виконується один раз; номер застосованої версії
+# зберігається у PRAGMA user_version. Нові зміни схеми додаються в кінець.
+
+
+def migrate_rates_unique(cursor):
+    """
+    Версія 1: залишає лише останній запис для кожного
+    (date, currency, source) і створює унікальний індекс для upsert.
+    """
+    cursor.execute(SQL_DEDUPLICATE_RATES)
+    if cursor.rowcount > 0:
+        print(f"Видалено дублікатів курсів: {cursor.rowcount}")
+    cursor.execute(SQL_CREATE_RATES_UNIQUE)
+
+
+def migrate_rates_lookup_index(cursor):
+    """
+    Версія 2: покривний індекс (currency, source, date, rate) для
+    SQL_SELECT_LATEST_RATE і SQL_SELECT_HISTORY — без сканування і сортування.
+    """
+    cursor.execute(SQL_CREATE_RATES_LOOKUP)
+
+
+def migrate_stats_tables(cursor):
+    """Версія 3: денна статистика команд і гістограми часу обробки."""
+    cursor.execute(SQL_CREATE_STATS_DAILY)
+    cursor.execute(SQL_CREATE_STATS_LATENCY)
+
+
+def migrate_alerts_table(cursor):
+    """Версія 4: порогові сповіщення користувачів про зміну курсу."""
+    cursor.execute(SQL_CREATE_ALERTS)
+    cursor.execute(SQL_CREATE_ALERTS_USER)
+
+
+def migrate_rollup_table(cursor):
+    """Версія 5: агрегати курсів за день, тиждень і місяць, заповнені з наявної історії."""
+    cursor.execute(SQL_CREATE_ROLLUP)
+    cursor.execute(SQL_SELECT_ALL_RATES)
+    update_rollups(cursor, cursor.fetchall())
+
+
+def migrate_rebuild_rollups(cursor):
+    """
+    Версія 6: агрегати заново з rates. Раніше кожен запис курсу додавався
+    як нове спостереження, і повторні записи того самого дня їх спотворювали.
+    """
+    cursor.execute(SQL_DELETE_ROLLUPS)
+    cursor.execute(SQL_SELECT_ALL_RATES)
+    update_rollups(cursor, cursor.fetchall())
+
+
+def migrate_rates_written(cursor):
+    """
+    Версія 7: номер запису курсу (written) з індексом — позначка, за якою
+    часові ряди в пам'яті дочитують усі нові й перезаписані курси, зокрема за минулі дати.
+    """
+    cursor.execute(SQL_ADD_RATES_WRITTEN)
+    cursor.execute(SQL_INIT_RATES_WRITTEN)
+    cursor.execute(SQL_CREATE_RATES_WRITTEN)
+
+
+MIGRATIONS = [
+    migrate_rates_unique,
+    migrate_rates_lookup_index,
+    migrate_stats_tables,
+    migrate_alerts_table,
+    migrate_rollup_table,
+    migrate_rebuild_rollups,
+    migrate_rates_written,
+]
+
+
+def apply_migrations(cursor):
+    """Застосовує всі міграції, новіші за поточну версію схеми."""
+    cursor.execute("PRAGMA user_version")
+    version = cursor.fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(cursor)
+        cursor.execute(f"PRAGMA user_version = {number}")
+        print(f"Схему БД оновлено до версії {number}")
+
+
+def rollup_bucket(period, date):
+    """Перший день інтервалу агрегації period ("day", "week" або "month"), що містить дату."""
+    day = date_cls.fromisoformat(date)
+    if period == "week":
+        day -= timedelta(days=day.weekday())  # Понеділок
+    elif period == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
+
+def rollup_next(period, bucket):
+    """Перший день наступного інтервалу (як ROLLUP_NEXT)."""
+    day = date_cls.fromisoformat(bucket)
+    if period == "day":
+        return (day + timedelta(days=1)).isoformat()
+    if period == "week":
+        return (day + timedelta(days=7)).isoformat()
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1).isoformat()
+
+
+def update_rollups(cursor, rows):
+    """
+    Перераховує агрегати rates_rollup інтервалів, яких торкнулись курси
+    [(date, currency, source, rate), ...] (викликається після запису в rates).
+    """
+    buckets = {
+        (period, currency, source, rollup_bucket(period, date))
+        for date, currency, source, _ in rows
+        for period in ROLLUP_PERIODS
+    }
+    for period, sql in SQL_REBUILD_ROLLUPS.items():
+        cursor.executemany(sql, [
+            {"period": period, "currency": currency, "source": source, "bucket": bucket}
+            for bucket_period, currency, source, bucket in buckets
+            if bucket_period == period
+        ])
 
 
 def add_rate(date, currency, source, rate):
-    """Додає новий курс у таблицю rates."""
+    """Зберігає курс за день (повторний запис за той самий день оновлює курс)."""
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(SQL_INSERT_RATE, (date, currency, source, rate))
+            update_rollups(cursor, [(date, currency, source, rate)])
             conn.commit()
     except Exception as e:
         print(f"Помилка при додаванні курсу: {e}")
 
 
+def add_rates(rows):
+    """
+    Зберігає пакет курсів [(date, currency, source, rate), ...] однією транзакцією.
+    Повертає True, якщо пакет записано.
+    """
+    try:
+        with get_connection() as conn:
+            conn.executemany(SQL_INSERT_RATE, rows)
+            update_rollups(conn, rows)
+            conn.commit()
+            return True
+    except Exception as e:
+        print(f"Помилка при пакетному додаванні курсів: {e}")
+        return False
+
+
 def get_latest_rate(currency, source):
     """Повертає останній курс для заданої валюти і джерела."""
     try:
@@ -103,7 +474,7 @@ def get_latest_rate(currency, source):
 
 
 def get_history(currency, source, days=7):
-    """Повертає історію курсів за N днів (від найстарішого до найновішого)."""
+    """Повертає історію курсів за останні N днів (від найстарішого до найновішого)."""
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
@@ -114,12 +485,81 @@ def get_history(currency, source, days=7):
         return []
 
 
-def add_subscriber(user_id):
-    """Додає нового підписника (або ігнорує, якщо вже є)."""
+def get_rollup(currency, source, period, start=""):
+    """
+    Повертає агрегати курсу period ("day", "week" або "month") від дати start:
+    [(bucket, open, close, low, high, total, count), ...] від найстарішого.
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_ROLLUP, (period, currency, source, start))
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні агрегатів курсу: {e}")
+        return []
+
+
+def get_rates_since(start=""):
+    """Повертає всі курси з датою >= start [(date, currency, source, rate), ...] від найстарішого."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_RATES_SINCE, (start,))
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні курсів: {e}")
+        return []
+
+
+def get_rates_watermark():
+    """Повертає номер останнього запису курсу (0, якщо курсів немає)."""
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(SQL_INSERT_SUBSCRIBER, (user_id,))
+            cursor.execute(SQL_SELECT_RATES_WATERMARK)
+            return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Помилка при отриманні номера запису курсів: {e}")
+        return None
+
+
+def get_rate_writes(after=0):
+    """
+    Повертає курси, записані або перезаписані після запису номер after,
+    [(written, date, currency, source, rate), ...] у порядку запису.
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_RATE_WRITES, (after,))
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні записаних курсів: {e}")
+        return []
+
+
+def get_rate_dates(currency, source, start, end):
+    """Повертає дати (YYYY-MM-DD) з діапазону [start, end], за які курс уже збережено."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_RATE_DATES, (currency, source, start, end))
+            return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Помилка при отриманні дат курсів: {e}")
+        return []
+
+
+def add_subscriber(user_id, resubscribe=False):
+    """
+    Додає нового підписника (або ігнорує, якщо вже є).
+    resubscribe=True знову підписує відписаного (явна команда /subscribe).
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_RESUBSCRIBE if resubscribe else SQL_INSERT_SUBSCRIBER, (user_id,))
             conn.commit()
     except Exception as e:
         print(f"Помилка при додаванні підписника: {e}")
@@ -148,15 +588,127 @@ def get_subscribers():
         return []
 
 
-def increment_command_stat(command):
-    """Збільшує лічильник викликів команди (або створює запис, якщо його ще немає)."""
+def get_subscribers_page(after_id=0, limit=1000):
+    """
+    Повертає наступну сторінку підписників (user_id > after_id).
+    Пагінація за ключем не сканує вже прочитані рядки, як це робив би OFFSET.
+    """
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_SUBSCRIBERS_PAGE, (after_id, limit))
+            return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Помилка при отриманні сторінки підписників: {e}")
+        return []
+
+
+def count_subscribers():
+    """Повертає кількість підписаних користувачів."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_COUNT_SUBSCRIBERS)
+            return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Помилка при підрахунку підписників: {e}")
+        return 0
+
+
+def add_alert(user_id, currency, source, kind, threshold, base_rate):
+    """Додає сповіщення і повертає його id (None при помилці)."""
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(SQL_INCREMENT_COMMAND_STAT, (command,))
+            cursor.execute(SQL_INSERT_ALERT, (user_id, currency, source, kind, threshold, base_rate))
             conn.commit()
+            return cursor.lastrowid
     except Exception as e:
-        print(f"Помилка при оновленні статистики команди: {e}")
+        print(f"Помилка при додаванні сповіщення: {e}")
+        return None
+
+
+def remove_alert(user_id, alert_id):
+    """Вимикає сповіщення користувача. Повертає True, якщо воно існувало."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_DEACTIVATE_USER_ALERT, (alert_id, user_id))
+            conn.commit()
+            return cursor.rowcount > 0
+    except Exception as e:
+        print(f"Помилка при видаленні сповіщення: {e}")
+        return False
+
+
+def get_user_alerts(user_id):
+    """Повертає активні сповіщення користувача (id, user_id, currency, source, kind, threshold, base_rate)."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_USER_ALERTS, (user_id,))
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні сповіщень користувача: {e}")
+        return []
+
+
+def get_active_alerts():
+    """Повертає всі активні сповіщення (для побудови індексу порогів)."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_ACTIVE_ALERTS)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні активних сповіщень: {e}")
+        return []
+
+
+def get_alerts(alert_ids):
+    """Повертає активні сповіщення з переданими id (вимкнені пропускаються)."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            rows = []
+            for alert_id in alert_ids:
+                cursor.execute(SQL_SELECT_ACTIVE_ALERT, (alert_id,))
+                rows += cursor.fetchall()
+            return rows
+    except Exception as e:
+        print(f"Помилка при отриманні сповіщень: {e}")
+        return []
+
+
+def update_fired_alerts(deactivate, rearm):
+    """
+    Зберігає результат спрацювання сповіщень однією транзакцією.
+    deactivate — id одноразових сповіщень, rearm — [(новий base_rate, id), ...]
+    """
+    try:
+        with get_connection() as conn:
+            conn.executemany(SQL_DEACTIVATE_ALERT, [(alert_id,) for alert_id in deactivate])
+            conn.executemany(SQL_REARM_ALERT, rearm)
+            conn.commit()
+    except Exception as e:
+        print(f"Помилка при оновленні сповіщень: {e}")
+
+
+def add_command_stats(totals, daily, latency):
+    """
+    Додає накопичені лічильники однією транзакцією.
+    totals — {command: count}
+    daily — {(day, command): count}
+    latency — {(command, bucket): count}
+    """
+    try:
+        with get_connection() as conn:
+            conn.executemany(SQL_ADD_COMMAND_STAT, list(totals.items()))
+            conn.executemany(SQL_ADD_DAILY_STAT, [(day, cmd, n) for (day, cmd), n in daily.items()])
+            conn.executemany(SQL_ADD_LATENCY_STAT, [(cmd, b, n) for (cmd, b), n in latency.items()])
+            conn.commit()
+    except Exception as e:
+        print(f"Помилка при оновленні статистики команд: {e}")
 
 
 def get_all_stats():
@@ -169,3 +721,27 @@ def get_all_stats():
     except Exception as e:
         print(f"Помилка при отриманні статистики: {e}")
         return []
+
+
+def get_daily_stats(day):
+    """Повертає статистику команд за день (список кортежів (command, count))."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_DAILY_STATS, (day,))
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні денної статистики: {e}")
+        return []
+
+
+def get_latency_stats():
+    """Повертає гістограми часу обробки (список кортежів (command, bucket, count))."""
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_LATENCY_STATS)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Помилка при отриманні гістограм часу обробки: {e}")
+        return []
@@ -0,0 +1,487 @@
+# db/storage.py
+
+import json
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date as date_cls
+from config import STORAGE_BACKEND, REDIS_URL
+from db import aio
+from db.queries import ROLLUP_PERIODS, rollup_bucket, rollup_next
+
+ALERT_CHANGES_KEPT = 10000  # Скільки останніх версій змін сповіщень зберігає журнал
+
+
+class SQLiteStorage:
+    """
+    Локальне сховище на SQLite (db/queries.py через потік БД з db/aio.py).
+    Підходить для однієї репліки: блокування діють лише в межах процесу.
+    """
+
+    def __init__(self):
+        self._locks = {}  # name -> час закінчення блокування
+        self._breakers = {}  # Стан запобіжників джерел (одна репліка — достатньо пам'яті процесу)
+        self._alerts_version = 0  # Лічильник змін сповіщень (пише лише цей процес)
+        self._alert_changes = {}  # id сповіщення -> версія останньої зміни (у порядку версій)
+
+    async def init(self):
+        return await aio.init_db()
+
+    async def close(self):
+        await aio.close_db()
+
+    async def acquire_lock(self, name, ttl):
+        now = time.monotonic()
+        if self._locks.get(name, 0) > now:
+            return False
+        self._locks[name] = now + ttl
+        return True
+
+    async def get_breakers(self):
+        return dict(self._breakers)
+
+    async def save_breaker(self, name, fields):
+        self._breakers[name] = dict(fields)
+
+    add_rate = staticmethod(aio.add_rate)
+    add_rates = staticmethod(aio.add_rates)
+    get_latest_rate = staticmethod(aio.get_latest_rate)
+    get_history = staticmethod(aio.get_history)
+    get_rate_dates = staticmethod(aio.get_rate_dates)
+    get_rollup = staticmethod(aio.get_rollup)
+    get_rates_since = staticmethod(aio.get_rates_since)
+    get_rates_watermark = staticmethod(aio.get_rates_watermark)
+    get_rate_writes = staticmethod(aio.get_rate_writes)
+    add_subscriber = staticmethod(aio.add_subscriber)
+    remove_subscriber = staticmethod(aio.remove_subscriber)
+    get_subscribers_page = staticmethod(aio.get_subscribers_page)
+    count_subscribers = staticmethod(aio.count_subscribers)
+    add_command_stats = staticmethod(aio.add_command_stats)
+    get_all_stats = staticmethod(aio.get_all_stats)
+    get_daily_stats = staticmethod(aio.get_daily_stats)
+    get_latency_stats = staticmethod(aio.get_latency_stats)
+    get_user_alerts = staticmethod(aio.get_user_alerts)
+    get_active_alerts = staticmethod(aio.get_active_alerts)
+
+    # Кожна зміна сповіщень збільшує версію і записує id змінених у журнал (див. utils/alerts.py)
+
+    def _alerts_changed(self, alert_ids):
+        self._alerts_version += 1
+        for alert_id in alert_ids:
+            self._alert_changes.pop(alert_id, None)
+            self._alert_changes[alert_id] = self._alerts_version
+        oldest = self._alerts_version - ALERT_CHANGES_KEPT
+        while self._alert_changes and next(iter(self._alert_changes.values())) <= oldest:
+            del self._alert_changes[next(iter(self._alert_changes))]
+
+    async def add_alert(self, user_id, currency, source, kind, threshold, base_rate):
+        alert_id = await aio.add_alert(user_id, currency, source, kind, threshold, base_rate)
+        if alert_id is not None:
+            self._alerts_changed([alert_id])
+        return alert_id
+
+    async def remove_alert(self, user_id, alert_id):
+        removed = await aio.remove_alert(user_id, alert_id)
+        if removed:
+            self._alerts_changed([alert_id])
+        return removed
+
+    async def update_fired_alerts(self, deactivate, rearm):
+        await aio.update_fired_alerts(deactivate, rearm)
+        self._alerts_changed(list(deactivate) + [alert_id for _, alert_id in rearm])
+
+    async def get_alerts_version(self):
+        return self._alerts_version
+
+    async def get_alert_changes(self, after):
+        """
+        Зміни сповіщень після версії after: (версія, {id: рядок або None, якщо вимкнено}).
+        None, якщо after не відповідає журналу (потрібне повне перечитування).
+        """
+        if not 0 <= self._alerts_version - after <= ALERT_CHANGES_KEPT:
+            return None
+        version = self._alerts_version
+        ids = []
+        for alert_id, changed in reversed(self._alert_changes.items()):
+            if changed <= after:
+                break
+            ids.append(alert_id)
+        changes = dict.fromkeys(ids)
+        if ids:
+            changes.update((row[0], row) for row in await aio.get_alerts(ids))
+        return version, changes
+
+
+def build_rollup(items):
+    """Агрегат [open_date, open, close_date, close, low, high, total, count] з відсортованих [(date, rate), ...]."""
+    rates = [rate for _, rate in items]
+    return [items[0][0], items[0][1], items[-1][0], items[-1][1], min(rates), max(rates), sum(rates), len(rates)]
+
+
+class RedisStorage:
+    """
+    Спільне мережеве сховище на Redis для кількох реплік бота.
+    client — клієнт з інтерфейсом redis.asyncio.Redis (decode_responses=True);
+    для локальних перевірок підходить fakeredis.aioredis.FakeRedis.
+
+    Схема ключів:
+    rates:{currency}:{source} — hash {date: rate}
+    rates:dates:{currency}:{source} — zset дат (score — номер дня) для останніх N днів
+    rates:written — номер останнього запису курсів
+    rates:journal — zset "{currency}:{source}:{date}" (score — номер запису, що записав курс дня)
+    subscribers — zset user_id (score = user_id) для посторінкового читання
+    subscribers:unsubscribed — set user_id відписаних (/start не підписує їх знову)
+    stats, stats:daily:{day} — hash {command: count}
+    stats:latency — hash {"command|bucket": count}
+    rollup:{period}:{currency}:{source} — hash {bucket: JSON [open_date, open, close_date, close, low, high, total, count]}
+    rollup:{period}:{currency}:{source}:buckets — zset початків періодів (score — номер дня)
+    alerts — hash {id: JSON [user_id, currency, source, kind, threshold, base_rate]} активних сповіщень
+    alerts:user:{user_id} — set id сповіщень користувача
+    alerts:next_id, alerts:version — лічильники id і змін сповіщень
+    alerts:changes — zset id змінених сповіщень (score — версія останньої зміни)
+    lock:{name} — блокування між репліками (SET NX PX)
+    breakers — hash {source: JSON стану запобіжника} (пише репліка, що збирає курси джерела)
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def init(self):
+        return bool(await self.client.ping())
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def acquire_lock(self, name, ttl):
+        """
+        Бере блокування на ttl секунд; True лише для однієї репліки.
+        Блокування не знімається явно (див. utils.scheduler.run_exclusive), а спливає за ttl.
+        """
+        return bool(await self.client.set(f"lock:{name}", 1, nx=True, px=int(ttl * 1000)))
+
+    async def get_breakers(self):
+        return {name: json.loads(fields) for name, fields in (await self.client.hgetall("breakers")).items()}
+
+    async def save_breaker(self, name, fields):
+        await self.client.hset("breakers", name, json.dumps(fields))
+
+    # --- Курси ---
+
+    async def add_rate(self, date, currency, source, rate):
+        await self.add_rates([(date, currency, source, rate)])
+
+    async def add_rates(self, rows):
+        by_pair = defaultdict(dict)  # (currency, source) -> {date: rate}; пізніший рядок дня перемагає, як upsert
+        for date, currency, source, rate in rows:
+            by_pair[(currency, source)][date] = rate
+        keys = ["rates:written"]
+        for currency, source in by_pair:
+            keys += [f"rates:{currency}:{source}", f"rates:dates:{currency}:{source}"]
+            keys += [f"rollup:{period}:{currency}:{source}" for period in ROLLUP_PERIODS]
+
+        async def update(pipe):
+            # Під WATCH команди виконуються одразу: агрегати зачеплених інтервалів перераховуються
+            # з курсів у сховищі, тож повторний запис того самого дня не рахується двічі
+            written = int(await pipe.get("rates:written") or 0) + 1
+            rollups = {}  # (ключ агрегату, bucket) -> агрегат
+            for (currency, source), dates in by_pair.items():
+                buckets = {(period, rollup_bucket(period, date)) for date in dates for period in ROLLUP_PERIODS}
+                low = min(date_cls.fromisoformat(bucket).toordinal() for _, bucket in buckets)
+                high = max(date_cls.fromisoformat(rollup_next(period, bucket)).toordinal() for period, bucket in buckets)
+                stored = await pipe.zrangebyscore(f"rates:dates:{currency}:{source}", low, high - 1)
+                rates = dict(zip(stored, await pipe.hmget(f"rates:{currency}:{source}", stored))) if stored else {}
+                rates = {date: float(rate) for date, rate in rates.items() if rate is not None}
+                rates.update(dates)
+                items = sorted(rates.items())
+                days = [date for date, _ in items]
+                for period, bucket in buckets:
+                    # Зріз відсортованого списку замість перебору всіх курсів для кожного інтервалу
+                    start, end = bisect_left(days, bucket), bisect_left(days, rollup_next(period, bucket))
+                    rollups[(f"rollup:{period}:{currency}:{source}", bucket)] = build_rollup(items[start:end])
+            pipe.multi()
+            for (currency, source), dates in by_pair.items():
+                pipe.hset(f"rates:{currency}:{source}", mapping=dates)
+                pipe.zadd(f"rates:dates:{currency}:{source}", {
+                    date: date_cls.fromisoformat(date).toordinal() for date in dates
+                })
+                # Журнал записів: пакет отримує один номер, перезапис дня переносить його вперед
+                pipe.zadd("rates:journal", {f"{currency}:{source}:{date}": written for date in dates})
+            pipe.set("rates:written", written)
+            for (key, bucket), record in rollups.items():
+                pipe.hset(key, bucket, json.dumps(record))
+                pipe.zadd(f"{key}:buckets", {bucket: date_cls.fromisoformat(bucket).toordinal()})
+
+        # Якщо курси чи агрегати паралельно змінила інша репліка, транзакція повториться
+        await self.client.transaction(update, *keys)
+        return True
+
+    async def get_rates_watermark(self):
+        return int(await self.client.get("rates:written") or 0)
+
+    async def get_rate_writes(self, after=0):
+        entries = await self.client.zrangebyscore("rates:journal", f"({after}", "+inf", withscores=True)
+        by_pair = defaultdict(list)  # (currency, source) -> [(written, date), ...]
+        for member, written in entries:
+            currency, source, date = member.rsplit(":", 2)
+            by_pair[(currency, source)].append((int(written), date))
+        rows = []
+        for (currency, source), writes in by_pair.items():
+            rates = await self.client.hmget(f"rates:{currency}:{source}", [date for _, date in writes])
+            rows += [
+                (written, date, currency, source, float(rate))
+                for (written, date), rate in zip(writes, rates) if rate is not None
+            ]
+        return sorted(rows)
+
+    async def get_rates_since(self, start=""):
+        low = date_cls.fromisoformat(start).toordinal() if start else "-inf"
+        rows = []
+        # rates:{currency}:{source}; шаблон з трьох символів не захоплює rates:dates:*
+        async for key in self.client.scan_iter(match="rates:???:*"):
+            _, currency, source = key.split(":", 2)
+            dates = await self.client.zrangebyscore(f"rates:dates:{currency}:{source}", low, "+inf")
+            if dates:
+                rates = await self.client.hmget(key, dates)
+                rows += [(date, currency, source, float(rate)) for date, rate in zip(dates, rates) if rate is not None]
+        return sorted(rows)
+
+    async def get_rollup(self, currency, source, period, start=""):
+        key = f"rollup:{period}:{currency}:{source}"
+        low = date_cls.fromisoformat(start).toordinal() if start else "-inf"
+        buckets = await self.client.zrangebyscore(f"{key}:buckets", low, "+inf")
+        if not buckets:
+            return []
+        records = await self.client.hmget(key, buckets)
+        rows = []
+        for bucket, raw in zip(buckets, records):
+            if raw:
+                record = json.loads(raw)
+                rows.append((bucket, record[1], record[3], record[4], record[5], record[6], record[7]))
+        return rows
+
+    async def get_latest_rate(self, currency, source):
+        history = await self.get_history(currency, source, days=1)
+        if not history:
+            return None
+        date, rate = history[-1]
+        return rate, date
+
+    async def get_history(self, currency, source, days=7):
+        dates = await self.client.zrevrange(f"rates:dates:{currency}:{source}", 0, days - 1)
+        if not dates:
+            return []
+        rates = await self.client.hmget(f"rates:{currency}:{source}", dates)
+        return [(date, float(rate)) for date, rate in zip(dates, rates) if rate is not None][::-1]
+
+    async def get_rate_dates(self, currency, source, start, end):
+        return await self.client.zrangebyscore(
+            f"rates:dates:{currency}:{source}",
+            date_cls.fromisoformat(start).toordinal(), date_cls.fromisoformat(end).toordinal(),
+        )
+
+    # --- Підписники ---
+
+    async def add_subscriber(self, user_id, resubscribe=False):
+        if resubscribe:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.srem("subscribers:unsubscribed", str(user_id))
+            pipe.zadd("subscribers", {str(user_id): user_id})
+            await pipe.execute()
+        elif not await self.client.sismember("subscribers:unsubscribed", str(user_id)):
+            await self.client.zadd("subscribers", {str(user_id): user_id})
+
+    async def remove_subscriber(self, user_id):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrem("subscribers", str(user_id))
+        pipe.sadd("subscribers:unsubscribed", str(user_id))
+        await pipe.execute()
+
+    async def get_subscribers_page(self, after_id=0, limit=1000):
+        page = await self.client.zrangebyscore("subscribers", f"({after_id}", "+inf", start=0, num=limit)
+        return [int(user_id) for user_id in page]
+
+    async def count_subscribers(self):
+        return await self.client.zcard("subscribers")
+
+    # --- Сповіщення ---
+
+    async def _change_alerts(self, update, *keys):
+        """
+        Виконує зміну сповіщень у транзакції під WATCH alerts:version.
+        update(pipe) читає потрібне, викликає pipe.multi(), додає команди і повертає
+        (id змінених сповіщень, результат); зміна отримує нову версію, а змінені id
+        записуються в журнал alerts:changes, з якого інші репліки оновлюють індекс.
+        """
+        async def transaction(pipe):
+            version = int(await pipe.get("alerts:version") or 0) + 1
+            alert_ids, result = await update(pipe)
+            if alert_ids:
+                pipe.set("alerts:version", version)
+                pipe.zadd("alerts:changes", {alert_id: version for alert_id in alert_ids})
+                pipe.zremrangebyscore("alerts:changes", "-inf", version - ALERT_CHANGES_KEPT)
+            return result
+
+        return await self.client.transaction(transaction, "alerts:version", *keys, value_from_callable=True)
+
+    async def add_alert(self, user_id, currency, source, kind, threshold, base_rate):
+        alert_id = await self.client.incr("alerts:next_id")
+
+        async def update(pipe):
+            pipe.multi()
+            pipe.hset("alerts", alert_id, json.dumps([user_id, currency, source, kind, threshold, base_rate]))
+            pipe.sadd(f"alerts:user:{user_id}", alert_id)
+            return [alert_id], alert_id
+
+        return await self._change_alerts(update)
+
+    async def remove_alert(self, user_id, alert_id):
+        async def update(pipe):
+            removed = bool(await pipe.sismember(f"alerts:user:{user_id}", alert_id))
+            pipe.multi()
+            if removed:
+                pipe.srem(f"alerts:user:{user_id}", alert_id)
+                pipe.hdel("alerts", alert_id)
+            return [alert_id] if removed else [], removed
+
+        return await self._change_alerts(update, f"alerts:user:{user_id}")
+
+    async def get_user_alerts(self, user_id):
+        ids = sorted(int(alert_id) for alert_id in await self.client.smembers(f"alerts:user:{user_id}"))
+        if not ids:
+            return []
+        records = await self.client.hmget("alerts", ids)
+        return [(alert_id, *json.loads(record)) for alert_id, record in zip(ids, records) if record]
+
+    async def get_active_alerts(self):
+        return [(int(alert_id), *json.loads(record)) for alert_id, record in (await self.client.hgetall("alerts")).items()]
+
+    async def update_fired_alerts(self, deactivate, rearm):
+        ids = list(deactivate) + [alert_id for _, alert_id in rearm]
+        if not ids:
+            return
+
+        async def update(pipe):
+            records = dict(zip(ids, await pipe.hmget("alerts", ids)))
+            pipe.multi()
+            changed = []
+            for alert_id in deactivate:
+                if records.get(alert_id):
+                    pipe.srem(f"alerts:user:{json.loads(records[alert_id])[0]}", alert_id)
+                    pipe.hdel("alerts", alert_id)
+                    changed.append(alert_id)
+            for base_rate, alert_id in rearm:
+                if records.get(alert_id):
+                    fields = json.loads(records[alert_id])
+                    fields[5] = base_rate
+                    pipe.hset("alerts", alert_id, json.dumps(fields))
+                    changed.append(alert_id)
+            return changed, None
+
+        await self._change_alerts(update)
+
+    async def get_alerts_version(self):
+        return int(await self.client.get("alerts:version") or 0)
+
+    async def get_alert_changes(self, after):
+        """Див. SQLiteStorage.get_alert_changes; читає лише журнал і змінені записи, без hgetall."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get("alerts:version")
+        pipe.zrangebyscore("alerts:changes", f"({after}", "+inf")
+        version, ids = await pipe.execute()
+        version = int(version or 0)
+        if not 0 <= version - after <= ALERT_CHANGES_KEPT:
+            return None
+        records = await self.client.hmget("alerts", ids) if ids else []
+        return version, {
+            int(alert_id): (int(alert_id), *json.loads(record)) if record else None
+            for alert_id, record in zip(ids, records)
+        }
+
+    # --- Статистика ---
+
+    async def add_command_stats(self, totals, daily, latency):
+        pipe = self.client.pipeline(transaction=True)
+        for command, count in totals.items():
+            pipe.hincrby("stats", command, count)
+        for (day, command), count in daily.items():
+            pipe.hincrby(f"stats:daily:{day}", command, count)
+        for (command, bucket), count in latency.items():
+            pipe.hincrby("stats:latency", f"{command}|{bucket}", count)
+        await pipe.execute()
+
+    async def get_all_stats(self):
+        return [(command, int(count)) for command, count in (await self.client.hgetall("stats")).items()]
+
+    async def get_daily_stats(self, day):
+        stats = await self.client.hgetall(f"stats:daily:{day}")
+        return [(command, int(count)) for command, count in stats.items()]
+
+    async def get_latency_stats(self):
+        rows = []
+        for key, count in (await self.client.hgetall("stats:latency")).items():
+            command, bucket = key.rsplit("|", 1)
+            rows.append((command, float(bucket), int(count)))
+        return sorted(rows)
+
+
+def create_storage(backend=STORAGE_BACKEND):
+    """Створює сховище за налаштуванням STORAGE_BACKEND ("sqlite" або "redis")."""
+    if backend == "redis":
+        import redis.asyncio as redis  # Необов'язкова залежність, лише для STORAGE_BACKEND=redis
+        return RedisStorage(redis.from_url(REDIS_URL, decode_responses=True))
+    return SQLiteStorage()
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage):
+    """Підміняє активне сховище (наприклад, на RedisStorage з fakeredis)."""
+    global _storage
+    _storage = storage
+
+
+def _delegate(name):
+    async def call(*args, **kwargs):
+        return await getattr(get_storage(), name)(*args, **kwargs)
+    call.__name__ = name
+    return call
+
+
+# --- Асинхронний API сховища (використовується хендлерами і фоновими задачами) ---
+init = _delegate("init")
+close = _delegate("close")
+acquire_lock = _delegate("acquire_lock")
+get_breakers = _delegate("get_breakers")
+save_breaker = _delegate("save_breaker")
+add_rate = _delegate("add_rate")
+add_rates = _delegate("add_rates")
+get_latest_rate = _delegate("get_latest_rate")
+get_history = _delegate("get_history")
+get_rate_dates = _delegate("get_rate_dates")
+get_rollup = _delegate("get_rollup")
+get_rates_since = _delegate("get_rates_since")
+get_rates_watermark = _delegate("get_rates_watermark")
+get_rate_writes = _delegate("get_rate_writes")
+add_subscriber = _delegate("add_subscriber")
+remove_subscriber = _delegate("remove_subscriber")
+get_subscribers_page = _delegate("get_subscribers_page")
+count_subscribers = _delegate("count_subscribers")
+add_alert = _delegate("add_alert")
+remove_alert = _delegate("remove_alert")
+get_user_alerts = _delegate("get_user_alerts")
+get_active_alerts = _delegate("get_active_alerts")
+update_fired_alerts = _delegate("update_fired_alerts")
+get_alerts_version = _delegate("get_alerts_version")
+get_alert_changes = _delegate("get_alert_changes")
+add_command_stats = _delegate("add_command_stats")
+get_all_stats = _delegate("get_all_stats")
+get_daily_stats = _delegate("get_daily_stats")
+get_latency_stats = _delegate("get_latency_stats")
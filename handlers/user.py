@@ -1,51 +1,64 @@
 # handlers/user.py
 
 from aiogram import Router, types
-from aiogram.filters import Command
-from aiogram.types import InputFile, FSInputFile
-from db.queries import (
-    add_subscriber, remove_subscriber, get_history, get_latest_rate, increment_command_stat, get_subscribers, get_all_stats
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile
+from db.storage import (
+    add_subscriber, remove_subscriber, get_latest_rate, count_subscribers, get_all_stats, get_daily_stats,
+    get_user_alerts,
 )
-from utils.parsers import get_usd_nbu, get_eur_nbu, get_usd_privat, get_usd_mono, get_usd_minfin, get_gbp_nbu, get_pln_nbu
-from utils.charts import create_chart
+from utils.compare import compare_rates, format_comparison
+from utils.breaker import get_breaker, load_breakers, OPEN
+from utils.parsers import SOURCES
+from utils.charts import get_chart
+from utils.history import MAX_HISTORY_LINES, get_series, parse_history_args, parse_period, period_label
+from utils.timeseries import store as timeseries, get_stats, format_stats
+from utils.inline import inline_answers
+from utils.alerts import ABOVE, BELOW, CHANGE, alert_engine, describe, parse_alert_args, Alert
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-from config import ADMIN_ID
+from middlewares.stats import stats as command_stats
+from config import ADMIN_ID, ALERTS_PER_USER, INLINE_CACHE_TIME
+from datetime import datetime
 
 router = Router()
 
 @router.message(Command("start"))
 async def cmd_start(message: types.Message):
-    increment_command_stat("start")
     if message.from_user:
-        add_subscriber(message.from_user.id)
+        await add_subscriber(message.from_user.id)
     await message.answer(
         "Вітаю! Я бот для відстеження курсу валют 💸\n"
         "Доступні команди:\n"
         "/admin — адмін-панель (тільки для адміністратора)\n"
         "/usd — курс долара\n"
         "/eur — курс євро\n"
-        "/compare — порівняння курсів\n"
+        "/compare — порівняння курсів (/compare EUR)\n"
         "/currency — вибір валюти та порівняння курсів\n"
-        "/history — історія курсів\n"
-        "/chart — графік\n"
+        "/history — історія курсів (/history EUR PrivatBank 30d)\n"
+        "/chart — графік (/chart USD 5y)\n"
+        "/stats — статистика курсу (/stats EUR 1y)\n"
         "/subscribe — підписка на розсилку\n"
-        "/unsubscribe — відписка"
+        "/unsubscribe — відписка\n"
+        "/alert — сповіщення про курс (/alert USD PrivatBank > 42.5)\n"
+        "/alerts — ваші сповіщення"
     )
 
 @router.message(Command("help"))
 async def cmd_help(message: types.Message):
-    increment_command_stat("help")
     await message.answer(
         "Доступні команди:\n"
         "/admin — адмін-панель (тільки для адміністратора)\n"
         "/usd — курс долара\n"
         "/eur — курс євро\n"
-        "/compare — порівняння курсів\n"
+        "/compare — порівняння курсів (/compare EUR)\n"
         "/currency — вибір валюти та порівняння курсів\n"
-        "/history — історія курсів\n"
-        "/chart — графік\n"
+        "/history — історія курсів (/history EUR PrivatBank 30d)\n"
+        "/chart — графік (/chart USD 5y)\n"
+        "/stats — статистика курсу (/stats EUR 1y)\n"
         "/subscribe — підписка на розсилку\n"
-        "/unsubscribe — відписка"
+        "/unsubscribe — відписка\n"
+        "/alert — сповіщення про курс (/alert USD PrivatBank > 42.5)\n"
+        "/alerts — ваші сповіщення"
     )
 
 @router.message(Command("admin"))
@@ -54,57 +67,61 @@ async def cmd_admin(message: types.Message):
         await message.answer("⛔️ Доступ заборонено.")
         return
 
-    subs = get_subscribers()
-    stats = get_all_stats()
+    await command_stats.flush()  # Скидаємо накопичені лічильники перед читанням
+    subs = await count_subscribers()
+    stats = await get_all_stats()
+    today = dict(await get_daily_stats(datetime.now().strftime("%Y-%m-%d")))
     text = f"👑 Адмін-панель\n\n"
-    text += f"Підписників: {len(subs)}\n\n"
-    text += "Статистика команд:\n"
+    text += f"Підписників: {subs}\n\n"
+    text += "Статистика команд (всього / сьогодні):\n"
     for cmd, count in stats:
-        text += f"/{cmd}: {count}\n"
+        text += f"/{cmd}: {count} / {today.get(cmd, 0)}\n"
+    text += "\nДжерела курсів:\n"
+    await load_breakers()  # Стан, який записала репліка, що збирає курси
+    for name in SOURCES:
+        breaker = get_breaker(name)
+        text += f"{name}: {breaker.state}"
+        if breaker.state == OPEN:
+            text += f", проба через {breaker.retry_in():.0f} с"
+        if breaker.last_error:
+            text += f" ({breaker.failures} помилок, остання: {breaker.last_error})"
+        text += "\n"
+    text += f"\nЧасові ряди в пам'яті: {timeseries.points()} точок, {timeseries.nbytes() // 1024} КБ\n"
     await message.answer(text)
 
 @router.message(Command("usd"))
 async def cmd_usd(message: types.Message):
-    increment_command_stat("usd")
-    rate, date = get_usd_nbu()  # Парсимо курс і одразу зберігаємо в БД
-    if rate:
+    latest = await get_latest_rate("USD", "NBU")  # Курс з БД (оновлює фоновий збирач)
+    if latest:
+        rate, date = latest
         await message.answer(f"Курс USD (НБУ): {rate} грн\nДата: {date}")
     else:
         await message.answer("Не вдалося отримати курс USD.")
 
 @router.message(Command("eur"))
 async def cmd_eur(message: types.Message):
-    increment_command_stat("eur")
-    rate, date = get_eur_nbu()
-    if rate:
+    latest = await get_latest_rate("EUR", "NBU")
+    if latest:
+        rate, date = latest
         await message.answer(f"Курс EUR (НБУ): {rate} грн\nДата: {date}")
     else:
         await message.answer("Не вдалося отримати курс EUR.")
 
 @router.message(Command("compare"))
-async def cmd_compare(message: types.Message):
-    increment_command_stat("compare")
-    nbu, _ = get_usd_nbu()
-    privat, _ = get_usd_privat()
-    mono, _ = get_usd_mono()
-    minfin, _ = get_usd_minfin()
-
-    text = "Порівняння курсу USD:\n"
-    text += f"НБУ: {nbu if nbu else 'н/д'} грн\n"
-    text += f"ПриватБанк: {privat if privat else 'н/д'} грн\n"
-    text += f"Монобанк: {mono if mono else 'н/д'} грн\n"
-    text += f"Мінфін: {minfin if minfin else 'н/д'} грн\n"
-
-    await message.answer(text)
+async def cmd_compare(message: types.Message, command: CommandObject):
+    currency = (command.args or "USD").strip().upper()  # /compare EUR
+    if len(currency) != 3 or not currency.isalpha():
+        await message.answer("Вкажіть код валюти з трьох літер: /compare EUR")
+        return
+    results = await compare_rates(currency)  # Курси всіх джерел з БД
+    await message.answer(format_comparison(currency, results))
 
 @router.message(Command("currency"))
 async def cmd_currency(message: types.Message):
-    increment_command_stat("currency")
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="USD"), KeyboardButton(text="EUR")],
-            [KeyboardButton(text="PLN"), KeyboardButton(text="BTC")],
-            [KeyboardButton(text="GBP")],
+            [KeyboardButton(text="PLN"), KeyboardButton(text="GBP")],
 		  ],
         resize_keyboard=True,
         one_time_keyboard=True
@@ -112,70 +129,141 @@ async def cmd_currency(message: types.Message):
     await message.answer("Оберіть валюту:", reply_markup=keyboard)
 
 @router.message(Command("history"))
-async def cmd_history(message: types.Message):
-    increment_command_stat("history")
-    history = get_history("USD", "NBU", days=7)
-    if history:
-        text = "Історія курсу USD (НБУ):\n"
-        text += "\n".join([f"{date}: {rate} грн" for date, rate in history])
+async def cmd_history(message: types.Message, command: CommandObject):
+    try:
+        currency, source, period = parse_history_args(command.args)  # /history EUR PrivatBank 30d
+    except ValueError as e:
+        await message.answer(str(e))
+        return
+    series = await get_series(currency, source.name, period, max_points=MAX_HISTORY_LINES)
+    if series:
+        text = f"Історія курсу {currency} ({source.title}) за {period_label(period)}:\n"
+        for point in series:
+            text += f"{point.date}: {point.close} грн"
+            if point.low != point.high:
+                text += f" (мін {point.low}, макс {point.high})"
+            text += "\n"
         await message.answer(text)
     else:
         await message.answer("Історія порожня.")
 
 @router.message(Command("subscribe"))
 async def cmd_subscribe(message: types.Message):
-    increment_command_stat("subscribe")
     if message.from_user:
-        add_subscriber(message.from_user.id)
+        await add_subscriber(message.from_user.id, resubscribe=True)
     await message.answer("Ви підписані на щоденну розсилку курсу!")
 
 @router.message(Command("unsubscribe"))
 async def cmd_unsubscribe(message: types.Message):
-    increment_command_stat("unsubscribe")
     if message.from_user:
-        remove_subscriber(message.from_user.id)
+        await remove_subscriber(message.from_user.id)
     await message.answer("Ви відписалися від розсилки.")
 
 @router.message(Command("chart"))
-async def cmd_chart(message: types.Message):
-    increment_command_stat("chart")
-    history = get_history("USD", "NBU", days=7)
-    if not history:
+async def cmd_chart(message: types.Message, command: CommandObject):
+    try:
+        currency, source, period = parse_history_args(command.args)  # /chart USD 5y
+    except ValueError as e:
+        await message.answer(str(e))
+        return
+    series = await get_series(currency, source.name, period)  # Не більше MAX_CHART_POINTS точок
+    if not series:
+        await message.answer("Історія порожня.")
+        return
+    label = period_label(period)
+    png = await get_chart(series, currency, source.title, period, label)  # Рендер у пулі потоків з кешем
+    if not png:
+        await message.answer("Не вдалося побудувати графік.")
+        return
+    input_file = BufferedInputFile(png, filename=f"chart_{currency}.png")
+    await message.answer_photo(input_file, caption=f"Графік курсу {currency} ({source.title}) за {label}")
+
+@router.message(Command("stats"))
+async def cmd_stats(message: types.Message, command: CommandObject):
+    try:
+        currency, source, period = parse_history_args(command.args, default_period="30d")  # /stats EUR 1y
+    except ValueError as e:
+        await message.answer(str(e))
+        return
+    if not timeseries.loaded:
+        await message.answer("Історія курсів ще завантажується, спробуйте за хвилину.")
+        return
+    stats = get_stats(currency, source.name, parse_period(period))  # Рахується в пам'яті, без запитів до БД
+    if stats:
+        await message.answer(format_stats(currency, source.title, period_label(period), stats))
+    else:
         await message.answer("Історія порожня.")
+
+@router.message(Command("alert"))
+async def cmd_alert(message: types.Message, command: CommandObject):
+    if not message.from_user:
+        return
+    try:
+        currency, source, kind, threshold = parse_alert_args(command.args)
+    except ValueError as e:
+        await message.answer(str(e))
         return
-    file_path = create_chart(history)
-    input_file = FSInputFile(file_path)
-    await message.answer_photo(input_file, caption="Графік курсу USD (НБУ) за 7 днів")
+    if len(await get_user_alerts(message.from_user.id)) >= ALERTS_PER_USER:
+        await message.answer(f"Можна мати не більше {ALERTS_PER_USER} сповіщень. Видаліть зайві: /alerts")
+        return
+    latest = await get_latest_rate(currency, source)
+    if not latest:
+        # Без жодного курсу в сховищі сповіщення для цієї пари ніколи не спрацювало б
+        await message.answer(f"Ще немає курсу {currency} ({source}), сповіщення створити не можна.")
+        return
+    if (kind == ABOVE and latest[0] >= threshold) or (kind == BELOW and latest[0] <= threshold):
+        # Сповіщення перевіряються лише на зміні курсу, тож уже досягнутий поріг не спрацював би
+        await message.answer(f"Курс {currency} ({source}) уже {latest[0]} грн — поріг досягнуто, вкажіть інший.")
+        return
+    alert = await alert_engine.create(message.from_user.id, currency, source, kind, threshold, latest[0])
+    if alert is None:
+        await message.answer("Не вдалося створити сповіщення.")
+        return
+    await message.answer(f"🔔 Сповіщення #{alert.id}: {describe(alert)}\nЗараз: {latest[0]} грн ({latest[1]})")
+
+@router.message(Command("alerts"))
+async def cmd_alerts(message: types.Message):
+    if not message.from_user:
+        return
+    alerts = [Alert(*row) for row in await get_user_alerts(message.from_user.id)]
+    if not alerts:
+        await message.answer("У вас немає сповіщень. Додати: /alert USD > 42.5")
+        return
+    text = "Ваші сповіщення:\n"
+    text += "\n".join(f"#{alert.id}: {describe(alert)}" for alert in alerts)
+    text += "\n\nВидалити: /unalert НОМЕР"
+    await message.answer(text)
+
+@router.message(Command("unalert"))
+async def cmd_unalert(message: types.Message, command: CommandObject):
+    if not message.from_user:
+        return
+    alert_id = (command.args or "").strip().lstrip("#")
+    if not alert_id.isdigit():
+        await message.answer("Вкажіть номер сповіщення: /unalert 12")
+        return
+    if await alert_engine.remove(message.from_user.id, int(alert_id)):
+        await message.answer(f"Сповіщення #{alert_id} видалено.")
+    else:
+        await message.answer(f"Сповіщення #{alert_id} не знайдено.")
+
+@router.inline_query()
+async def cmd_inline(inline_query: types.InlineQuery):
+    # Готові відповіді з пам'яті (utils/inline.py): без запитів до БД і банків
+    results = inline_answers.answer(inline_query.query)
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=False)
 
 @router.message()
 async def handle_currency_choice(message: types.Message):
-    currency = message.text.upper()
-    if currency not in ["USD", "EUR", "PLN", "BTC", "GBP"]:
+    currency = (message.text or "").strip().upper()
+    if len(currency) != 3 or not currency.isalpha():
         return  # Ігноруємо інші повідомлення
 
-    # Парсимо курс з різних джерел (приклад для USD/EUR)
-    if currency == "USD":
-        nbu, _ = get_usd_nbu()
-        privat, _ = get_usd_privat()
-        mono, _ = get_usd_mono()
-        minfin, _ = get_usd_minfin()
-        text = "Порівняння курсу USD:\n"
-        text += f"НБУ: {nbu if nbu else 'н/д'} грн\n"
-        text += f"ПриватБанк: {privat if privat else 'н/д'} грн\n"
-        text += f"Монобанк: {mono if mono else 'н/д'} грн\n"
-        text += f"Мінфін: {minfin if minfin else 'н/д'} грн\n"
-    elif currency == "EUR":
-        # Додай аналогічні парсери для EUR (get_eur_nbu, get_eur_privat, ...)
-        text = "Порівняння курсу EUR:\n(реалізуй парсери для EUR)"
-    elif currency == "PLN":
-        nbu, _ = get_pln_nbu()
-        text = f"Курс PLN (НБУ): {nbu if nbu else 'н/д'} грн\n"
-    elif currency == "BTC":
-        text = "Порівняння курсу BTC:\n(реалізуй парсери для BTC)"
-    elif currency == "GBP":
-        nbu, _ = get_gbp_nbu()
-        text = f"Курс GBP (НБУ): {nbu if nbu else 'н/д'} грн\n"
-    else:
-        text = "Невідома валюта."
+    # Порівнюємо курс з усіх джерел, що надають цю валюту (utils/parsers.SOURCES)
+    results = await compare_rates(currency)
+    if not any(rate for _, rate, _ in results):
+        if currency in ["USD", "EUR", "PLN", "GBP"]:
+            await message.answer(f"Немає даних про курс {currency}.")
+        return  # Невідомі коди валют ігноруємо
 
-    await message.answer(text)
\ No newline at end of file
+    await message.answer(format_comparison(currency, results))
@@ -1,45 +1,41 @@
 # main.py
 
+import time
+
+STARTED_AT = time.perf_counter()  # Для вимірювання часу холодного старту
+
 import asyncio
 import sys
+from aiohttp import web
 from aiogram import Bot, Dispatcher
-from config import BOT_TOKEN
-from db.queries import init_db
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from config import (
+    BOT_TOKEN, RUN_MODE, WEB_HOST, WEB_PORT, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET
+)
+from db import storage
 from handlers import user
+from utils import alerts, charts, health, inline, timeseries
+from utils.http import close_session
+from utils.parsers import add_rate_listener
+from utils.scheduler import create_scheduler, warm_up_rates
+from middlewares.stats import StatsMiddleware, stats
 from aiogram.types import BotCommand
 
-import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
-
-
-def run_stub_server():
-    class Handler(BaseHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.end_headers()
-            self.wfile.write(b"OK")
-
-        def do_HEAD(self):
-            self.send_response(200)
-            self.end_headers()
-
-        def log_message(self, format, *args):
-            return  # Вимикаємо логування у консоль
-
-    server = HTTPServer(("0.0.0.0", 8080), Handler)
-    server.serve_forever()
-
-# Запускаємо заглушку у окремому потоці
-threading.Thread(target=run_stub_server, daemon=True).start()
 
 async def main():
-    # 1. Ініціалізуємо базу даних
-    init_db()
+    # 1. Ініціалізуємо сховище (SQLite або Redis, див. STORAGE_BACKEND)
+    if not await storage.init():
+        print("❌ Помилка: не вдалося ініціалізувати сховище (див. помилку вище).")
+        sys.exit(1)
+    health.set_ready("db")
 
     # 2. Перевіряємо наявність токена
     if not BOT_TOKEN:
         print("❌ Помилка: BOT_TOKEN не знайдено! Додайте токен у .env файл.")
         sys.exit(1)
+    if RUN_MODE == "webhook" and not WEBHOOK_BASE_URL:
+        print("❌ Помилка: для RUN_MODE=webhook потрібен WEBHOOK_BASE_URL.")
+        sys.exit(1)
 
     # 3. Створюємо бота та диспетчер
     bot = Bot(token=BOT_TOKEN)
@@ -51,25 +47,86 @@ async def main():
         BotCommand(command="admin", description="Адмін-панель (тільки для адміністратора)"),
         BotCommand(command="usd", description="Курс долара (НБУ)"),
         BotCommand(command="eur", description="Курс євро (НБУ)"),
-        BotCommand(command="compare", description="Порівняння курсу USD з різних джерел"),
+        BotCommand(command="compare", description="Порівняння курсу валюти з різних джерел"),
         BotCommand(command="currency", description="Вибір валюти та порівняння курсів"),
-        BotCommand(command="history", description="Історія курсу USD"),
-        BotCommand(command="chart", description="Графік курсу USD"),
+        BotCommand(command="history", description="Історія курсу (/history EUR 30d)"),
+        BotCommand(command="chart", description="Графік курсу (/chart USD 1y)"),
+        BotCommand(command="stats", description="Статистика курсу (/stats EUR 1y)"),
         BotCommand(command="subscribe", description="Підписка на розсилку"),
         BotCommand(command="unsubscribe", description="Відписка від розсилки"),
+        BotCommand(command="alert", description="Сповіщення про зміну курсу"),
+        BotCommand(command="alerts", description="Мої сповіщення"),
         BotCommand(command="help", description="Допомога"),
     ]
     await bot.set_my_commands(commands)
 
     # 4. Підключаємо роутери
     dp.include_router(user.router)
+    dp.message.middleware(StatsMiddleware(stats))  # Статистика команд у пам'яті
+    dp.inline_query.middleware(StatsMiddleware(stats))  # Інлайн-запити рахуються як команда inline
+
+    # Запускаємо фоновий збір курсів (команди читають лише з БД)
+    scheduler = create_scheduler(bot)
+    scheduler.start()
+    alert_notifier = alerts.setup(bot)  # Перевірка сповіщень після кожного збору курсів
+    add_rate_listener(timeseries.store.on_snapshot)  # Нові курси одразу в часові ряди в пам'яті
+    add_rate_listener(inline.inline_answers.on_snapshot)  # І в готові відповіді інлайн-режиму
+
+    # Перший збір курсів, історія та інлайн-відповіді в пам'яті і важка залежність matplotlib — у фоні після старту
+    warm_up_tasks = [
+        asyncio.create_task(warm_up_rates()),
+        asyncio.create_task(timeseries.store.load()),
+        asyncio.create_task(inline.inline_answers.refresh()),
+        asyncio.create_task(charts.warm_up()),
+    ]
 
-    # 5. Запускаємо бота
-    print("Бот запущено!")
-    await dp.start_polling(bot)
+    async def on_shutdown():
+        scheduler.shutdown(wait=False)
+        await alert_notifier.stop()
+        await stats.flush()  # Зберігаємо статистику, накопичену з останнього скидання
+        await close_session()  # Закриваємо спільну HTTP-сесію
+        await storage.close()
+
+    dp.shutdown.register(on_shutdown)
+
+    # 5. Один HTTP-сервер у тому ж event loop: health-check, readiness і (у режимі webhook) апдейти Telegram
+    app = health.create_app()
+    if RUN_MODE == "webhook":
+        SimpleRequestHandler(
+            dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET or None
+        ).register(app, path=WEBHOOK_PATH)
+        setup_application(app, dp, bot=bot)  # startup/shutdown диспетчера разом із сервером
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, WEB_HOST, WEB_PORT).start()
+
+    # 6. Запускаємо бота
+    print(f"Бот запущено ({RUN_MODE}) за {time.perf_counter() - STARTED_AT:.2f} с!")
+    try:
+        if RUN_MODE == "webhook":
+            await bot.set_webhook(
+                f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+            await asyncio.Event().wait()  # Апдейти обробляє aiohttp-сервер
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        await runner.cleanup()
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv:
+        # Звіт про час імпорту модулів при старті (бот не запускається)
+        from utils.startup import report_startup
+        report_startup()
+        sys.exit(0)
+    if "--backfill" in sys.argv or "--import" in sys.argv:
+        # Завантаження історичних курсів НБУ або імпорт дампу (бот не запускається)
+        from utils.backfill import run_cli
+        sys.exit(asyncio.run(run_cli(sys.argv[1:])))
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
-        print("Бот зупинено.")
\ No newline at end of file
+        print("Бот зупинено.")
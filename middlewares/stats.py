@@ -0,0 +1,77 @@
+# middlewares/stats.py
+
+import time
+from collections import Counter
+from datetime import datetime
+from aiogram import BaseMiddleware
+from db.storage import add_command_stats
+from utils.metrics import HANDLER_LATENCY
+
+# Верхні межі кошиків гістограми часу обробки (секунди); inf — усе, що більше
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+
+def latency_bucket(seconds):
+    """Повертає верхню межу кошика, до якого потрапляє час обробки."""
+    for bound in LATENCY_BUCKETS:
+        if seconds <= bound:
+            return bound
+    return LATENCY_BUCKETS[-1]
+
+
+class StatsAggregator:
+    """
+    Накопичує статистику команд у пам'яті і періодично скидає її в БД
+    однією транзакцією замість запису на кожне повідомлення.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.totals = Counter()  # command -> count
+        self.daily = Counter()  # (day, command) -> count
+        self.latency = Counter()  # (command, bucket) -> count
+
+    def record(self, command, seconds):
+        day = datetime.now().strftime("%Y-%m-%d")
+        self.totals[command] += 1
+        self.daily[(day, command)] += 1
+        self.latency[(command, latency_bucket(seconds))] += 1
+
+    async def flush(self):
+        """Записує накопичене в БД (викликається за розкладом і при зупинці)."""
+        if not self.totals:
+            return
+        totals, daily, latency = self.totals, self.daily, self.latency
+        self._reset()  # Нові події йдуть у свіжі лічильники, поки триває запис
+        await add_command_stats(totals, daily, latency)
+
+
+# Спільний агрегатор для всього процесу
+stats = StatsAggregator()
+
+
+class StatsMiddleware(BaseMiddleware):
+    """
+    Рахує виклики команд і час їх обробки.
+    Назва команди береться з імені хендлера: cmd_usd -> usd.
+    """
+
+    def __init__(self, aggregator=stats):
+        self.aggregator = aggregator
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "")
+        if not name.startswith("cmd_"):
+            return await handler(event, data)
+
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            command = name[len("cmd_"):]
+            elapsed = time.perf_counter() - started
+            self.aggregator.record(command, elapsed)
+            HANDLER_LATENCY.observe(elapsed, command=command)
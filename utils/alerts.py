@@ -0,0 +1,303 @@
+# utils/alerts.py
+
+import asyncio
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from config import ALERT_BATCH_SIZE
+from db import storage
+from utils.broadcast import send_messages
+from utils.parsers import SOURCES, add_rate_listener, find_source
+
+ABOVE = "above"  # Курс піднявся до порогу або вище
+BELOW = "below"  # Курс опустився до порогу або нижче
+CHANGE = "change"  # Курс змінився на threshold % від base_rate (після спрацювання база оновлюється)
+
+
+@dataclass(frozen=True, slots=True)
+class Alert:
+    id: int
+    user_id: int
+    currency: str
+    source: str
+    kind: str
+    threshold: float
+    base_rate: float = None
+
+    def bounds(self):
+        """Межі спрацювання: (верхня або None, нижня або None)."""
+        if self.kind == ABOVE:
+            return self.threshold, None
+        if self.kind == BELOW:
+            return None, self.threshold
+        delta = self.base_rate * self.threshold / 100
+        return self.base_rate + delta, self.base_rate - delta
+
+
+class ThresholdIndex:
+    """
+    Відсортовані пороги однієї пари (валюта, джерело).
+    upper — [(поріг, id)], спрацьовують при курсі >= порогу (префікс списку)
+    lower — [(поріг, id)], спрацьовують при курсі <= порогу (суфікс списку)
+    Пошук — двійковий, тож перевірка курсу не залежить від кількості сповіщень,
+    що не спрацювали.
+    """
+
+    __slots__ = ("upper", "lower")
+
+    def __init__(self):
+        self.upper = []
+        self.lower = []
+
+    def add(self, alert):
+        upper, lower = alert.bounds()
+        if upper is not None:
+            insort(self.upper, (upper, alert.id))
+        if lower is not None:
+            insort(self.lower, (lower, alert.id))
+
+    def remove(self, alert):
+        upper, lower = alert.bounds()
+        if upper is not None:
+            _remove(self.upper, (upper, alert.id))
+        if lower is not None:
+            _remove(self.lower, (lower, alert.id))
+
+    def match(self, rate):
+        """Вилучає з індексу і повертає id сповіщень, що спрацювали при курсі rate."""
+        high = bisect_right(self.upper, (rate, float("inf")))
+        low = bisect_left(self.lower, (rate, float("-inf")))
+        fired = [alert_id for _, alert_id in self.upper[:high]]
+        fired += [alert_id for _, alert_id in self.lower[low:]]
+        del self.upper[:high]
+        del self.lower[low:]
+        return fired
+
+
+def _remove(entries, entry):
+    index = bisect_left(entries, entry)
+    if index < len(entries) and entries[index] == entry:
+        del entries[index]
+
+
+class AlertEngine:
+    """
+    Індекс активних сповіщень у пам'яті і перевірка нових курсів.
+    Індекс будується зі сховища при першому зборі курсів; далі в нього
+    застосовуються лише зміни з журналу сховища після останньої прочитаної версії
+    (свої й інших реплік). Повне перечитування — лише якщо журнал уже не містить
+    потрібних версій.
+    """
+
+    def __init__(self):
+        self.alerts = {}  # id -> Alert
+        self.indexes = defaultdict(ThresholdIndex)  # (currency, source) -> ThresholdIndex
+        self.version = None  # Версія сховища, що відповідає індексу
+        self.notifier = None
+
+    def _add(self, alert):
+        self.alerts[alert.id] = alert
+        self.indexes[(alert.currency, alert.source)].add(alert)
+
+    def _discard(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is not None:
+            self.indexes[(alert.currency, alert.source)].remove(alert)
+        return alert
+
+    async def load(self):
+        """Перебудовує індекс з усіх активних сповіщень у сховищі."""
+        version = await storage.get_alerts_version()
+        self.build(Alert(*row) for row in await storage.get_active_alerts())
+        self.version = version
+        print(f"Індекс сповіщень побудовано: {len(self.alerts)} активних")
+
+    def build(self, alerts):
+        """Будує індекс одним сортуванням замість вставки кожного порогу."""
+        self.alerts = {}
+        self.indexes = defaultdict(ThresholdIndex)
+        for alert in alerts:
+            self.alerts[alert.id] = alert
+            upper, lower = alert.bounds()
+            index = self.indexes[(alert.currency, alert.source)]
+            if upper is not None:
+                index.upper.append((upper, alert.id))
+            if lower is not None:
+                index.lower.append((lower, alert.id))
+        for index in self.indexes.values():
+            index.upper.sort()
+            index.lower.sort()
+
+    async def sync(self):
+        """Застосовує до індексу зміни сповіщень, записані після self.version."""
+        if self.version is None:
+            await self.load()
+            return
+        changes = await storage.get_alert_changes(self.version)
+        if changes is None:
+            await self.load()
+            return
+        version, alerts = changes
+        for alert_id, row in alerts.items():
+            # Запис у сховищі — актуальний стан сповіщення (None — вимкнене), тож повтор безпечний
+            self._discard(alert_id)
+            if row is not None:
+                self._add(Alert(*row))
+        self.version = version
+
+    async def create(self, user_id, currency, source, kind, threshold, base_rate):
+        alert_id = await storage.add_alert(user_id, currency, source, kind, threshold, base_rate)
+        if alert_id is None:
+            return None
+        alert = Alert(alert_id, user_id, currency, source, kind, threshold, base_rate)
+        if self.version is not None:
+            self._add(alert)  # Одразу в індексі; версію наздожене sync()
+        return alert
+
+    async def remove(self, user_id, alert_id):
+        removed = await storage.remove_alert(user_id, alert_id)
+        if removed and self.version is not None:
+            self._discard(alert_id)
+        return removed
+
+    def match(self, currency, source, rate):
+        """Повертає сповіщення, що спрацювали, і вилучає їх з індексу."""
+        index = self.indexes.get((currency, source))
+        if index is None:
+            return []
+        fired = []
+        for alert_id in index.match(rate):
+            alert = self._discard(alert_id)  # Прибирає й другу межу сповіщення CHANGE
+            if alert is not None:
+                fired.append(alert)
+        return fired
+
+    async def on_snapshot(self, snapshot):
+        """Обробник нових курсів (utils.parsers.add_rate_listener)."""
+        await self.sync()
+        fired = []
+        for currency, rate in snapshot.rates.items():
+            fired += [(alert, rate) for alert in self.match(currency, snapshot.source, rate)]
+        if not fired:
+            return
+
+        deactivate, rearm = [], []
+        for alert, rate in fired:
+            if alert.kind == CHANGE:
+                rearm.append((rate, alert.id))
+                self._add(replace(alert, base_rate=rate))  # Наступне спрацювання — від нового курсу
+            else:
+                deactivate.append(alert.id)
+        await storage.update_fired_alerts(deactivate, rearm)
+        print(f"Спрацювало сповіщень {snapshot.source}: {len(fired)}")
+        if self.notifier is not None:
+            self.notifier.submit(group_messages(fired))
+
+
+ALERT_USAGE = (
+    "Формат: /alert ВАЛЮТА [ДЖЕРЕЛО] УМОВА\n"
+    "/alert USD PrivatBank > 42.5 — курс піднявся до 42.5 або вище\n"
+    "/alert EUR < 44 — курс НБУ опустився до 44 або нижче\n"
+    "/alert USD Monobank 1% — курс змінився більш ніж на 1%"
+)
+
+
+def parse_alert_args(args):
+    """
+    Розбирає аргументи /alert у (currency, source, kind, threshold).
+    Джерело за замовчуванням — NBU; ValueError з поясненням при помилці.
+    """
+    tokens = (args or "").split()
+    if len(tokens) < 2:
+        raise ValueError(ALERT_USAGE)
+    currency = tokens[0].upper()
+    if len(currency) != 3 or not currency.isalpha():
+        raise ValueError(ALERT_USAGE)  # НБУ приймає будь-який код, тож інакше сповіщення ніколи б не спрацювало
+    source = "NBU"
+    found = find_source(tokens[1])
+    if found:
+        source = found.name
+        tokens = tokens[1:]
+    condition = "".join(tokens[1:]).replace(",", ".")
+    if not SOURCES[source].supports(currency):
+        raise ValueError(f"Джерело {source} не надає курс {currency}.")
+    kind = value = None
+    try:
+        if condition.startswith(">"):
+            kind, value = ABOVE, float(condition[1:])
+        elif condition.startswith("<"):
+            kind, value = BELOW, float(condition[1:])
+        elif condition.endswith("%"):
+            kind, value = CHANGE, float(condition[:-1].lstrip("+±"))
+    except ValueError:
+        pass
+    # nan і inf порушили б порядок порогів у ThresholdIndex
+    if kind is None or not math.isfinite(value) or (kind == CHANGE and value <= 0):
+        raise ValueError(ALERT_USAGE)
+    return currency, source, kind, value
+
+
+def describe(alert):
+    """Опис умови сповіщення для користувача."""
+    if alert.kind == ABOVE:
+        return f"{alert.currency} ({alert.source}) ≥ {alert.threshold:g}"
+    if alert.kind == BELOW:
+        return f"{alert.currency} ({alert.source}) ≤ {alert.threshold:g}"
+    return f"{alert.currency} ({alert.source}) змінився на {alert.threshold:g}% від {alert.base_rate:g}"
+
+
+def group_messages(fired):
+    """Одне повідомлення на користувача з усіма його сповіщеннями, що спрацювали."""
+    lines = defaultdict(list)
+    for alert, rate in fired:
+        lines[alert.user_id].append(f"{describe(alert)}: зараз {rate:g} грн")
+    return [(user_id, "🔔 Сповіщення про курс\n\n" + "\n".join(items)) for user_id, items in lines.items()]
+
+
+class AlertNotifier:
+    """
+    Фонова відправка сповіщень: накопичує повідомлення в черзі і надсилає їх
+    пакетами до ALERT_BATCH_SIZE через send_messages з обмеженням швидкості,
+    не затримуючи збір курсів.
+    """
+
+    def __init__(self, bot, batch_size=ALERT_BATCH_SIZE):
+        self.bot = bot
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def submit(self, messages):
+        for message in messages:
+            self.queue.put_nowait(message)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                result = await send_messages(self.bot, batch)
+                print(f"Сповіщення надіслано: {result['sent']}, помилок {result['failed']}")
+            except Exception as e:
+                print(f"Помилка відправки сповіщень: {e}")
+
+
+alert_engine = AlertEngine()
+
+
+def setup(bot):
+    """Підключає перевірку сповіщень до збору курсів і запускає їх фонову відправку."""
+    alert_engine.notifier = AlertNotifier(bot)
+    alert_engine.notifier.start()
+    add_rate_listener(alert_engine.on_snapshot)
+    return alert_engine.notifier
@@ -0,0 +1,172 @@
+# utils/backfill.py
+
+import argparse
+import asyncio
+import csv
+import json
+from datetime import date, datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from config import BACKFILL_CONCURRENCY, BACKFILL_BATCH_DAYS, IMPORT_BATCH_SIZE
+from db import storage
+from utils.http import close_session, fetch_json
+from utils.parsers import NBU_HISTORY_URL, parse_nbu
+
+MARKER_CURRENCY = "USD"  # Є у фіді НБУ за кожен день: за нею визначаємо вже завантажені дні
+DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%Y%m%d")
+
+
+def parse_date(value):
+    """Приймає дату у форматі YYYY-MM-DD, DD.MM.YYYY або YYYYMMDD."""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"невідомий формат дати: {value!r}")
+
+
+# --- Backfill з API НБУ ---
+
+
+async def fetch_nbu_day(day, semaphore):
+    """Курси всіх валют НБУ за один день у вигляді рядків для add_rates."""
+    async with semaphore:
+        data = await fetch_json(NBU_HISTORY_URL.format(date=day.strftime("%Y%m%d")))
+    return [(day.isoformat(), currency, "NBU", rate) for currency, rate in parse_nbu(data).items()]
+
+
+async def backfill_nbu(start, end, concurrency=BACKFILL_CONCURRENCY, batch_days=BACKFILL_BATCH_DAYS):
+    """
+    Завантажує курси НБУ за кожен день діапазону [start, end].
+    Дні, що вже є в БД, пропускаються — перерваний backfill продовжується з місця зупинки.
+    Кожні batch_days днів зберігаються однією транзакцією.
+    Повертає (кількість збережених курсів, кількість днів з помилкою завантаження чи запису).
+    """
+    done = set(await storage.get_rate_dates(MARKER_CURRENCY, "NBU", start.isoformat(), end.isoformat()))
+    days = [
+        day for day in (start + timedelta(days=n) for n in range((end - start).days + 1))
+        if day.isoformat() not in done
+    ]
+    print(f"Backfill НБУ {start}..{end}: завантажити {len(days)} днів, вже є {len(done)}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    saved = failed = 0
+    for offset in range(0, len(days), batch_days):
+        batch = days[offset:offset + batch_days]
+        results = await asyncio.gather(
+            *(fetch_nbu_day(day, semaphore) for day in batch), return_exceptions=True
+        )
+        rows = []
+        fetched = 0
+        for day, result in zip(batch, results):
+            if isinstance(result, Exception):
+                failed += 1  # День не збережено — його завантажить наступний запуск
+                print(f"Помилка backfill НБУ за {day}: {result}")
+            else:
+                rows.extend(result)
+                fetched += 1
+        if rows:
+            if await storage.add_rates(rows):
+                saved += len(rows)
+            else:
+                failed += fetched  # Пакет не записано — ці дні теж завантажить наступний запуск
+                print(f"Помилка запису backfill НБУ за {batch[0]}..{batch[-1]}")
+        print(f"  до {batch[-1]}: збережено {saved} курсів")
+    return saved, failed
+
+
+# --- Імпорт дампів ---
+
+
+def read_json_lines(f):
+    """Об'єкти NDJSON-файлу по одному рядку; некоректні рядки пропускаються."""
+    for number, line in enumerate(f, start=1):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f"Пропущено рядок дампу {number}: {e}")
+
+
+def read_dump(path, source="NBU"):
+    """
+    Читає дамп курсів і віддає рядки (date, currency, source, rate).
+    CSV — із заголовком date,currency,rate[,source]; NDJSON (.ndjson, .jsonl) — по об'єкту
+    в рядку з тими ж полями або у форматі API НБУ (exchangedate, cc, rate). CSV і NDJSON
+    читаються потоково; JSON (.json) — один список таких об'єктів, що завантажується
+    в пам'ять цілком, тож великі дампи краще конвертувати в NDJSON.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8-sig", newline="") as f:
+        if suffix == ".json":
+            records = json.load(f)
+        elif suffix in (".ndjson", ".jsonl"):
+            records = read_json_lines(f)
+        else:
+            records = csv.DictReader(f)
+        for record in records:
+            try:
+                yield (
+                    parse_date(str(record.get("date") or record["exchangedate"])).isoformat(),
+                    str(record.get("currency") or record["cc"]).strip().upper(),
+                    record.get("source") or source,
+                    float(str(record["rate"]).replace(",", ".")),
+                )
+            except (KeyError, ValueError, TypeError) as e:
+                print(f"Пропущено рядок дампу {record}: {e}")
+
+
+async def import_dump(path, source="NBU", batch_size=IMPORT_BATCH_SIZE):
+    """
+    Імпортує дамп у БД пакетами по batch_size рядків.
+    Повертає (кількість імпортованих рядків, кількість рядків у пакетах, які не вдалося записати).
+    """
+    rows = read_dump(path, source)
+    imported = failed = 0
+    while batch := list(islice(rows, batch_size)):
+        if await storage.add_rates(batch):
+            imported += len(batch)
+        else:
+            failed += len(batch)
+            print(f"Помилка запису пакета дампу: {batch[0][0]}..{batch[-1][0]}")
+    print(f"Імпортовано {imported} курсів з {path}, не записано {failed}")
+    return imported, failed
+
+
+# --- Запуск з командного рядка ---
+
+
+async def run_cli(argv):
+    """
+    python main.py --backfill 2020-01-01 [2024-12-31]
+    python main.py --import rates.csv [--source NBU]
+    """
+    parser = argparse.ArgumentParser(prog="main.py")
+    parser.add_argument("--backfill", nargs="+", metavar="DATE", help="початкова [і кінцева] дата")
+    parser.add_argument("--import", dest="import_path", metavar="PATH", help="дамп CSV, NDJSON або JSON")
+    parser.add_argument("--source", default="NBU", help="джерело для рядків дампу без поля source")
+    parser.add_argument("--concurrency", type=int, default=BACKFILL_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    if not await storage.init():
+        await storage.close()
+        return 1
+    try:
+        status = 0
+        if args.import_path:
+            _, failed = await import_dump(args.import_path, args.source)
+            if failed:
+                status = 1
+        if args.backfill:
+            start = parse_date(args.backfill[0])
+            end = parse_date(args.backfill[1]) if len(args.backfill) > 1 else date.today()
+            saved, failed = await backfill_nbu(start, end, args.concurrency)
+            print(f"Backfill завершено: збережено {saved} курсів, днів з помилкою {failed}")
+            if failed:
+                status = 1
+        return status
+    finally:
+        await close_session()
+        await storage.close()
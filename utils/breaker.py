@@ -0,0 +1,117 @@
+# utils/breaker.py
+
+import time
+from config import BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_DELAY, BREAKER_MAX_DELAY
+from db import storage
+from utils.metrics import BREAKER_TRANSITIONS
+
+CLOSED = "closed"  # Джерело працює, запити проходять
+OPEN = "open"  # Джерело недоступне, запити не робляться до open_until
+HALF_OPEN = "half_open"  # Пробний запит: успіх закриває, невдача знову відкриває
+
+PROBE_TIMEOUT = 60  # Через скільки секунд незавершена проба (наприклад, репліка зупинилась) дозволяє нову
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для одного джерела курсів.
+    Після failure_threshold невдач поспіль перестає звертатися до джерела,
+    а пробні запити робить з експоненційно зростаючою паузою (до max_delay).
+    Стан спільний для реплік через сховище (див. load_breakers і save_breaker);
+    open_until — час за годинником (time.time), а не монотонний, щоб його розуміли інші процеси.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 base_delay=BREAKER_BASE_DELAY, max_delay=BREAKER_MAX_DELAY):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = CLOSED
+        self.failures = 0  # Невдачі поспіль
+        self.delay = base_delay  # Поточна пауза до наступної проби
+        self.open_until = 0.0  # Для OPEN — час проби, для HALF_OPEN — коли проба вважається втраченою
+        self.last_error = None
+
+    def allow(self):
+        """Чи можна зараз звертатися до джерела."""
+        if self.state == CLOSED:
+            return True
+        if time.time() >= self.open_until:
+            self.open_until = time.time() + PROBE_TIMEOUT
+            self._set_state(HALF_OPEN)
+            return True
+        return False  # Відкритий або проба вже триває
+
+    def record_success(self):
+        self.failures = 0
+        self.delay = self.base_delay
+        self.last_error = None
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self, error=None):
+        self.failures += 1
+        self.last_error = error
+        if self.state == HALF_OPEN:
+            # Проба не вдалась — подвоюємо паузу
+            self.delay = min(self.delay * 2, self.max_delay)
+            self._open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """Проба завершилась без результату (скасована): джерело знову відкрите, наступна проба — одразу."""
+        if self.state == HALF_OPEN:
+            self.open_until = time.time()
+            self._set_state(OPEN)
+
+    def retry_in(self):
+        """Скільки секунд лишилось до наступної проби (0, якщо не відкритий)."""
+        if self.state != OPEN:
+            return 0
+        return max(self.open_until - time.time(), 0)
+
+    def to_dict(self):
+        return {
+            "state": self.state, "failures": self.failures, "delay": self.delay,
+            "open_until": self.open_until, "last_error": self.last_error,
+        }
+
+    def restore(self, fields):
+        """Застосовує стан, збережений у сховищі (без лічильника переходів — його веде репліка, що перейшла)."""
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def _open(self):
+        self.open_until = time.time() + self.delay
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        print(f"Запобіжник {self.name}: {self.state} -> {state}")
+        self.state = state
+        BREAKER_TRANSITIONS.inc(source=self.name, state=state)
+
+
+_breakers = {}
+
+
+def get_breaker(name):
+    """Повертає запобіжник джерела (створює при першому зверненні)."""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def all_breakers():
+    return list(_breakers.values())
+
+
+async def load_breakers():
+    """Оновлює запобіжники цього процесу станом зі сховища (його записує репліка, що збирає курси)."""
+    for name, fields in (await storage.get_breakers()).items():
+        get_breaker(name).restore(fields)
+
+
+async def save_breaker(breaker):
+    await storage.save_breaker(breaker.name, breaker.to_dict())
@@ -0,0 +1,158 @@
+# utils/broadcast.py
+
+import asyncio
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from config import BROADCAST_RATE, BROADCAST_WORKERS
+from db.storage import get_latest_rate, get_subscribers_page, remove_subscriber
+from utils.compare import compare_rates, format_comparison
+
+PAGE_SIZE = 1000  # Скільки підписників читати з БД за раз
+MAX_RETRIES = 3  # Скільки разів повторювати відправку після 429
+PER_CHAT_INTERVAL = 1.0  # Telegram дозволяє ~1 повідомлення на секунду в один чат
+MAX_TRACKED_CHATS = 10000  # Після цього з пам'яті прибираються чати, куди вже можна писати
+
+
+class RateLimiter:
+    """
+    Рівномірно розподіляє відправки: не більше rate повідомлень на секунду
+    і не частіше одного повідомлення на per_chat секунд в один чат.
+    pause() зсуває наступний дозволений момент (наприклад, після 429).
+    """
+
+    def __init__(self, rate, per_chat=PER_CHAT_INTERVAL):
+        self.interval = 1.0 / rate
+        self.per_chat = per_chat
+        self._next = 0.0
+        self._chats = {}  # chat_id -> найраніший час наступної відправки в цей чат
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, chat_id=None):
+        loop = asyncio.get_running_loop()
+        if chat_id is not None:
+            # Місце в черзі чату резервується до очікування, тож паралельні воркери не збігаються
+            now = loop.time()
+            start = max(self._chats.get(chat_id, 0.0), now)
+            self._chats[chat_id] = start + self.per_chat
+            if len(self._chats) > MAX_TRACKED_CHATS:
+                self._chats = {chat: until for chat, until in self._chats.items() if until > now}
+            if start > now:
+                await asyncio.sleep(start - now)
+        async with self._lock:
+            wait = self._next - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next = max(self._next, loop.time()) + self.interval
+
+    def pause(self, seconds):
+        loop = asyncio.get_running_loop()
+        self._next = max(self._next, loop.time() + seconds)
+
+
+# Ліміт Telegram діє на весь бот, тож розсилка і сповіщення ділять одну чергу відправок
+send_limiter = RateLimiter(BROADCAST_RATE)
+
+
+async def iter_subscribers(page_size=PAGE_SIZE):
+    """Посторінково віддає user_id підписників, не завантажуючи всіх у пам'ять."""
+    after_id = 0
+    while True:
+        page = await get_subscribers_page(after_id, page_size)
+        for user_id in page:
+            yield user_id
+        if len(page) < page_size:
+            return
+        after_id = page[-1]
+
+
+async def render_daily_message():
+    """Формує текст щоденної розсилки з курсів у БД (один раз на всю розсилку)."""
+    text = "📬 Щоденний курс валют\n\n"
+    text += format_comparison("USD", await compare_rates("USD"))
+    eur = await get_latest_rate("EUR", "NBU")
+    if eur:
+        text += f"\nКурс EUR (НБУ): {eur[0]} грн\nДата: {eur[1]}"
+    return text
+
+
+async def _send(bot, limiter, chat_id, text, result):
+    for _ in range(MAX_RETRIES + 1):
+        await limiter.acquire(chat_id)
+        try:
+            await bot.send_message(chat_id, text)
+            result["sent"] += 1
+            return
+        except TelegramRetryAfter as e:
+            # Флуд-ліміт діє на всього бота: пригальмовуємо всіх воркерів (чекають у acquire)
+            limiter.pause(e.retry_after)
+        except TelegramForbiddenError:
+            # Користувач заблокував бота — більше не надсилаємо йому розсилку
+            await remove_subscriber(chat_id)
+            result["removed"] += 1
+            return
+        except TelegramBadRequest as e:
+            if "chat not found" in str(e).lower():
+                await remove_subscriber(chat_id)
+                result["removed"] += 1
+            else:
+                print(f"Помилка розсилки для {chat_id}: {e}")
+                result["failed"] += 1
+            return
+        except Exception as e:
+            print(f"Помилка розсилки для {chat_id}: {e}")
+            result["failed"] += 1
+            return
+    result["failed"] += 1
+
+
+async def send_messages(bot, messages, limiter=send_limiter, workers=BROADCAST_WORKERS):
+    """
+    Надсилає повідомлення (chat_id, text) через пул воркерів з обмеженням швидкості.
+    messages — звичайний або асинхронний ітератор; читається по мірі відправки.
+    limiter — за замовчуванням спільний для процесу send_limiter.
+    Повертає словник з кількістю надісланих, невдалих і відписаних.
+    """
+    queue = asyncio.Queue(maxsize=workers * 2)  # Обмежена черга: джерело читається по мірі відправки
+    result = {"sent": 0, "failed": 0, "removed": 0}
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                chat_id, text = item
+                await _send(bot, limiter, chat_id, text, result)
+            finally:
+                queue.task_done()
+
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    try:
+        if hasattr(messages, "__aiter__"):
+            async for item in messages:
+                await queue.put(item)
+        else:
+            for item in messages:
+                await queue.put(item)
+        for _ in tasks:
+            await queue.put(None)  # Сигнал воркерам завершитись
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return result
+
+
+async def broadcast(bot, text, limiter=send_limiter, workers=BROADCAST_WORKERS):
+    """Надсилає text усім підписникам (див. send_messages)."""
+    messages = ((user_id, text) async for user_id in iter_subscribers())
+    return await send_messages(bot, messages, limiter, workers)
+
+
+async def send_daily_broadcast(bot):
+    """Щоденна розсилка курсу всім підписникам (запускається планувальником)."""
+    text = await render_daily_message()
+    result = await broadcast(bot, text)
+    print(
+        f"Розсилку завершено: надіслано {result['sent']}, "
+        f"помилок {result['failed']}, відписано {result['removed']}"
+    )
@@ -0,0 +1,66 @@
+# utils/cache.py
+
+import asyncio
+import time
+from config import FAILURE_TTL
+from utils.metrics import CACHE_REQUESTS
+
+
+class TTLCache:
+    """
+    Кеш із часом життя записів та об'єднанням одночасних запитів.
+    Поки значення завантажується, всі інші запити з тим самим ключем
+    чекають на той самий future замість власного запиту до джерела.
+    """
+
+    def __init__(self, max_size=None, name="default"):
+        self.name = name  # Мітка кешу в метриках
+        self.max_size = max_size  # None — без обмеження кількості записів
+        self._values = {}  # key -> (expires_at, value)
+        self._inflight = {}  # key -> asyncio.Future
+
+    def peek(self, key):
+        """Повертає актуальне значення з кешу або None (без завантаження)."""
+        entry = self._values.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    async def get(self, key, loader, ttl, failure_ttl=FAILURE_TTL):
+        """
+        Повертає значення для key, викликаючи loader() лише при промаху.
+        Порожній результат (None) кешується на failure_ttl, щоб не
+        перевантажувати джерело, яке зараз не відповідає.
+        """
+        entry = self._values.get(key)
+        if entry and entry[0] > time.monotonic():
+            CACHE_REQUESTS.inc(cache=self.name, result="hit")
+            return entry[1]
+
+        future = self._inflight.get(key)
+        if future is None:
+            CACHE_REQUESTS.inc(cache=self.name, result="miss")
+            future = asyncio.ensure_future(self._load(key, loader, ttl, failure_ttl))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            CACHE_REQUESTS.inc(cache=self.name, result="coalesced")
+        # shield: скасування одного з очікувачів не скасовує спільне завантаження
+        return await asyncio.shield(future)
+
+    async def _load(self, key, loader, ttl, failure_ttl):
+        value = await loader()
+        lifetime = ttl if value is not None else failure_ttl
+        self._values.pop(key, None)
+        self._values[key] = (time.monotonic() + lifetime, value)
+        if self.max_size is not None and len(self._values) > self.max_size:
+            # Витісняємо найстаріший запис (словник зберігає порядок вставки)
+            del self._values[next(iter(self._values))]
+        return value
+
+    def invalidate(self, key=None):
+        """Видаляє один ключ або весь кеш."""
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
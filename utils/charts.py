@@ -1,63 +1,88 @@
 # utils/charts.py
 
-import matplotlib.pyplot as plt
-import os
-import time
+import asyncio
+import io
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import TTLCache
+from utils.metrics import CHART_RENDER_LATENCY
 
+CHART_WORKERS = 2  # Потоки для рендерингу графіків
+CHART_CACHE_TTL = 24 * 3600  # Готовий графік актуальний, поки не з'явились нові дані
+CHART_CACHE_SIZE = 256  # Максимальна кількість графіків у кеші
 
-def create_chart(history, currency="USD", user_id=None):
-    """
-    Створює графік курсу за історією.
-    history — список кортежів (date, rate)
-    currency — код валюти (для підпису і імені файлу)
-    user_id — (опціонально) додається до імені файлу для унікальності
-    """
-    # Розпаковуємо дати і курси
-    dates = [date for date, rate in history]
-    rates = [rate for date, rate in history]
-
-    # Створюємо фігуру і будуємо графік
-    plt.figure(figsize=(8, 4))
-    plt.plot(dates, rates, marker='o')
-    plt.title(f"Курс {currency} за останні {len(history)} днів")
-    plt.xlabel("Дата")
-    plt.ylabel("Курс, грн")
-    plt.grid(True)
-    plt.tight_layout()
-
-    # Генеруємо унікальне ім'я файлу (user_id + timestamp)
-    timestamp = int(time.time())
-    if user_id:
-        file_path = f"chart_{currency}_{user_id}_{timestamp}.png"
-    else:
-        file_path = f"chart_{currency}_{timestamp}.png"
-
-    # Зберігаємо графік у файл з обробкою помилок
+_executor = ThreadPoolExecutor(max_workers=CHART_WORKERS, thread_name_prefix="chart")
+_chart_cache = TTLCache(max_size=CHART_CACHE_SIZE, name="charts")
+
+
+def _load_matplotlib():
+    # matplotlib імпортується ліниво: це найважча залежність бота,
+    # і вона не потрібна, доки хтось не попросить графік
+    from matplotlib.figure import Figure
+    from matplotlib.backends import backend_agg  # noqa: F401 — бекенд для savefig у PNG
+    return Figure
+
+
+async def warm_up():
+    """Фоново завантажує matplotlib у потоці рендерингу, не затримуючи старт бота."""
+    loop = asyncio.get_running_loop()
     try:
-        plt.savefig(file_path)
+        await loop.run_in_executor(_executor, _load_matplotlib)
     except Exception as e:
-        print(f"Помилка при збереженні графіка: {e}")
-        plt.close()
-        return None
-    plt.close()
+        print(f"Помилка при завантаженні matplotlib: {e}")
 
-    return file_path
+
+def render_chart(series, currency="USD", source="NBU", label="7 дн."):
+    """
+    Створює графік курсу і повертає PNG як bytes.
+    series — список utils.history.Point (не більше MAX_CHART_POINTS точок)
+    currency, source, label — для підпису графіка
+    Використовується об'єктний API Figure (без глобального стану pyplot),
+    тому функцію можна безпечно викликати з робочих потоків.
+    """
+    dates = [date.fromisoformat(point.date) for point in series]
+    closes = [point.close for point in series]
+
+    Figure = _load_matplotlib()
+    with CHART_RENDER_LATENCY.time():
+        # Створюємо фігуру і будуємо графік
+        fig = Figure(figsize=(8, 4))
+        ax = fig.subplots()
+        ax.plot(dates, closes, marker="o" if len(series) <= 31 else None)
+        if any(point.low != point.high for point in series):
+            # Точка — агрегат кількох спостережень: показуємо діапазон мін–макс
+            ax.fill_between(
+                dates, [point.low for point in series], [point.high for point in series], alpha=0.2
+            )
+        ax.set_title(f"Курс {currency} ({source}) за {label}")
+        ax.set_xlabel("Дата")
+        ax.set_ylabel("Курс, грн")
+        ax.grid(True)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+
+        # Зберігаємо графік у буфер у пам'яті замість файлу на диску
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+    return buffer.getvalue()
 
 
-def cleanup_old_charts(directory=".", prefix="chart_", max_age_sec=3600):
+async def get_chart(series, currency="USD", source="NBU", period="7d", label="7 дн."):
     """
-    Видаляє старі графіки, щоб не захаращувати диск.
-    directory — де шукати файли
-    prefix — початок імені файлу
-    max_age_sec — максимальний вік файлу у секундах (за замовчуванням 1 година)
+    Повертає PNG графіка з кешу або рендерить його у пулі потоків.
+    Ключ кешу — (currency, source, period, остання точка), тож усі однакові
+    запити між оновленнями курсу коштують один рендер. Повертає None при помилці.
     """
-    now = time.time()
-    for filename in os.listdir(directory):
-        if filename.startswith(prefix) and filename.endswith(".png"):
-            file_path = os.path.join(directory, filename)
-            try:
-                if now - os.path.getmtime(file_path) > max_age_sec:
-                    os.remove(file_path)
-                    print(f"Видалено старий графік: {filename}")
-            except Exception as e:
-                print(f"Помилка при видаленні {filename}: {e}")
\ No newline at end of file
+    if not series:
+        return None
+    key = (currency, source, period, series[-1])
+
+    async def load():
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(_executor, render_chart, series, currency, source, label)
+        except Exception as e:
+            print(f"Помилка при побудові графіка: {e}")
+            return None
+
+    return await _chart_cache.get(key, load, CHART_CACHE_TTL)
@@ -0,0 +1,40 @@
+# utils/compare.py
+
+import asyncio
+from datetime import datetime
+from db.storage import get_latest_rate
+from utils.breaker import get_breaker, load_breakers, CLOSED
+from utils.parsers import sources_for
+
+
+async def compare_rates(currency):
+    """
+    Повертає список (назва джерела, курс, stale) для всіх джерел, що надають валюту.
+    Курси читаються з БД, куди їх складає фоновий збирач (utils/scheduler.py);
+    курс None, якщо джерело ще не має збережених даних.
+    stale — дата збереженого курсу, якщо він застарів (не сьогоднішній або
+    запобіжник джерела відкритий), інакше None. Стан запобіжників — спільний, зі сховища.
+    """
+    sources = sources_for(currency)
+    rows = await asyncio.gather(*(get_latest_rate(currency, source.name) for source in sources), load_breakers())
+    today = datetime.now().strftime("%Y-%m-%d")
+    results = []
+    for source, latest in zip(sources, rows[:-1]):
+        if not latest:
+            results.append((source.title, None, None))
+            continue
+        rate, date = latest
+        stale = date < today or get_breaker(source.name).state != CLOSED
+        results.append((source.title, rate, date if stale else None))
+    return results
+
+
+def format_comparison(currency, results):
+    """Формує текст порівняння курсів (н/д — для джерел без даних, ⚠️ — для застарілих)."""
+    text = f"Порівняння курсу {currency}:\n"
+    for name, rate, stale in results:
+        text += f"{name}: {rate if rate else 'н/д'} грн"
+        if rate and stale:
+            text += f" ⚠️ дані від {stale}"
+        text += "\n"
+    return text
@@ -0,0 +1,51 @@
+# utils/health.py
+
+import json
+from aiohttp import web
+from utils import metrics
+
+# Компоненти, які мають бути готові, перш ніж репліка прийматиме трафік
+_components = {
+    "db": False,  # БД ініціалізована і міграції застосовані
+    "rates": False,  # Перший збір курсів успішно збережено
+}
+
+
+def set_ready(component, ready=True):
+    """Позначає компонент готовим (або неготовим)."""
+    _components[component] = ready
+
+
+def is_ready(component=None):
+    """Чи готові всі компоненти (або лише component)."""
+    if component is not None:
+        return _components[component]
+    return all(_components.values())
+
+
+async def handle_health(request):
+    """Liveness: процес живий і event loop відповідає."""
+    return web.Response(text="OK")
+
+
+async def handle_ready(request):
+    """Readiness: 200 лише коли БД і курси готові, інакше 503."""
+    status = 200 if is_ready() else 503
+    return web.Response(
+        status=status, text=json.dumps(_components), content_type="application/json"
+    )
+
+
+async def handle_metrics(request):
+    """Метрики у текстовому форматі Prometheus."""
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+
+def create_app():
+    """Створює aiohttp-застосунок з ендпоінтами здоров'я і метрик (вебхук додається в main.py)."""
+    app = web.Application()
+    app.router.add_get("/", handle_health)
+    app.router.add_get("/healthz", handle_health)
+    app.router.add_get("/readyz", handle_ready)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
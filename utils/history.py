@@ -0,0 +1,146 @@
+# utils/history.py
+
+import math
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from db.storage import get_rollup, rollup_bucket
+from utils.parsers import find_source
+from utils.timeseries import store
+
+MAX_CHART_POINTS = 120  # Максимум точок на графіку за будь-який період
+MAX_HISTORY_LINES = 31  # Максимум рядків у текстовій історії
+DEFAULT_PERIOD = "7d"
+PERIOD_RE = re.compile(r"^(\d+)([dwmy])$|^all$")
+PERIOD_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+PERIOD_NAMES = {"d": "дн.", "w": "тиж.", "m": "міс.", "y": "р."}
+
+HISTORY_USAGE = (
+    "Формат: /history [ВАЛЮТА] [ДЖЕРЕЛО] [ПЕРІОД]\n"
+    "Період: 7d, 30d, 12w, 6m, 1y, 5y або all\n"
+    "Наприклад: /history EUR PrivatBank 30d, /chart USD 5y"
+)
+
+
+@dataclass(frozen=True)
+class Point:
+    """Курс за інтервал, що починається з date (день, тиждень, місяць або їх група)."""
+    date: str
+    open: float
+    close: float
+    low: float
+    high: float
+    avg: float
+
+
+def parse_period(text):
+    """Кількість днів у періоді ("30d", "1y") або None для "all"; ValueError, якщо формат невідомий."""
+    match = PERIOD_RE.match(text.lower())
+    if not match:
+        raise ValueError(HISTORY_USAGE)
+    if not match.group(1):
+        return None
+    days = int(match.group(1)) * PERIOD_DAYS[match.group(2)]
+    if days <= 0:
+        raise ValueError(HISTORY_USAGE)
+    if days >= date.today().toordinal():
+        return None  # Період довший за календар (10000y) — уся історія
+    return days
+
+
+def period_label(text):
+    match = PERIOD_RE.match(text.lower())
+    if not match.group(1):
+        return "весь час"
+    return f"{match.group(1)} {PERIOD_NAMES[match.group(2)]}"
+
+
+def parse_history_args(args, default_period=DEFAULT_PERIOD):
+    """
+    Розбирає аргументи /history, /chart і /stats у довільному порядку.
+    Повертає (currency, Source, period); за замовчуванням USD, НБУ, default_period.
+    """
+    currency, source, period = "USD", find_source("NBU"), default_period
+    for token in (args or "").split():
+        if PERIOD_RE.match(token.lower()):
+            period = token.lower()
+        elif find_source(token):
+            source = find_source(token)
+        elif len(token) == 3 and token.isalpha():
+            currency = token.upper()
+        else:
+            raise ValueError(HISTORY_USAGE)
+    parse_period(period)
+    if not source.supports(currency):
+        raise ValueError(f"Джерело {source.title} не надає курс {currency}.")
+    return currency, source, period
+
+
+def choose_rollup(days, max_points):
+    """Найдрібніший агрегат, який дає не більше ~max_points точок за період."""
+    if days is not None and days <= max_points:
+        return "day"
+    if days is not None and days <= max_points * 7:
+        return "week"
+    return "month"
+
+
+def downsample(rows, max_points):
+    """
+    Зливає сусідні агрегати (bucket, open, close, low, high, total, count) у групи,
+    щоб лишилось не більше max_points точок.
+    """
+    size = max(1, math.ceil(len(rows) / max_points))
+    points = []
+    for offset in range(0, len(rows), size):
+        group = rows[offset:offset + size]
+        total = sum(row[5] for row in group)
+        count = sum(row[6] for row in group)
+        points.append(Point(
+            date=group[0][0],
+            open=group[0][1],
+            close=group[-1][2],
+            low=min(row[3] for row in group),
+            high=max(row[4] for row in group),
+            avg=total / count,
+        ))
+    return points
+
+
+def downsample_series(days, rates, max_points):
+    """Те саме, що downsample, для днів і курсів з пам'яті (utils.timeseries) — векторно."""
+    import numpy as np  # Лінивий імпорт, як у utils/timeseries.py
+    if len(rates) == 0:
+        return []
+    size = max(1, math.ceil(len(rates) / max_points))
+    starts = np.arange(0, len(rates), size)
+    ends = np.append(starts[1:], len(rates)) - 1
+    lows = np.minimum.reduceat(rates, starts)
+    highs = np.maximum.reduceat(rates, starts)
+    means = np.add.reduceat(rates, starts) / (ends - starts + 1)
+    return [
+        Point(date.fromordinal(int(days[first])).isoformat(), float(rates[first]), float(rates[last]),
+              float(low), float(high), float(mean))
+        for first, last, low, high, mean in zip(starts, ends, lows, highs, means)
+    ]
+
+
+async def get_series(currency, source, period, max_points=MAX_CHART_POINTS):
+    """
+    Курс за період, не більше max_points точок, тож 5 років коштують стільки ж,
+    скільки тиждень. Читається з часових рядів у пам'яті; поки вони
+    завантажуються при старті — з агрегатів rates_rollup.
+    """
+    days = parse_period(period)
+    if store.loaded:
+        series = store.get(currency, source)
+        if series is None:
+            return []
+        start = date.today().toordinal() - days + 1 if days else None
+        return downsample_series(*series.window(start), max_points)
+    rollup = choose_rollup(days, max_points)
+    start = ""
+    if days is not None:
+        start = rollup_bucket(rollup, (date.today() - timedelta(days=days - 1)).isoformat())
+    rows = await get_rollup(currency, source, rollup, start)
+    return downsample(rows, max_points)
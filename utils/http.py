@@ -0,0 +1,101 @@
+# utils/http.py
+
+import codecs
+import aiohttp
+
+REQUEST_TIMEOUT = 5  # Таймаут для HTTP-запитів у секундах
+POOL_LIMIT = 100  # Максимальна кількість одночасних з'єднань у пулі
+POOL_LIMIT_PER_HOST = 10  # Максимум з'єднань до одного хоста
+STREAM_CHUNK_SIZE = 16384  # Розмір шматка при потоковому читанні відповіді
+
+# Спільна сесія з пулом з'єднань (створюється ліниво в межах event loop)
+_session = None
+
+
+def get_session():
+    """Повертає спільну aiohttp-сесію, створюючи її при першому виклику."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT, limit_per_host=POOL_LIMIT_PER_HOST, ttl_dns_cache=300
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session():
+    """Закриває спільну сесію (викликається при зупинці бота)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+async def fetch_json(url, **kwargs):
+    """Виконує GET-запит і повертає розібраний JSON."""
+    async with get_session().get(url, **kwargs) as response:
+        response.raise_for_status()
+        # Деякі API віддають JSON з неправильним Content-Type
+        return await response.json(content_type=None)
+
+
+async def fetch_text(url, **kwargs):
+    """Виконує GET-запит і повертає тіло відповіді як текст."""
+    async with get_session().get(url, **kwargs) as response:
+        response.raise_for_status()
+        return await response.text()
+
+
+def conditional_headers(validators, headers=None):
+    """Заголовки умовного запиту з валідаторів попередньої відповіді (ETag, Last-Modified)."""
+    headers = dict(headers or {})
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def update_validators(validators, response):
+    validators["etag"] = response.headers.get("ETag")
+    validators["last_modified"] = response.headers.get("Last-Modified")
+
+
+async def fetch_conditional(url, validators, headers=None, **kwargs):
+    """
+    Умовний GET-запит: надсилає If-None-Match / If-Modified-Since з validators
+    і записує туди ETag і Last-Modified нової відповіді.
+    Повертає тіло в байтах або None, якщо сервер відповів 304 Not Modified.
+    """
+    async with get_session().get(url, headers=conditional_headers(validators, headers), **kwargs) as response:
+        if response.status == 304:
+            return None
+        response.raise_for_status()
+        update_validators(validators, response)
+        return await response.read()
+
+
+async def fetch_stream(url, consume, validators=None, headers=None, **kwargs):
+    """
+    Виконує GET-запит і віддає тіло шматками тексту у consume(text, final).
+    Якщо consume повертає True, решта відповіді не завантажується.
+    З validators запит умовний, як у fetch_conditional; повертає False,
+    якщо сервер відповів 304 Not Modified (consume не викликається).
+    """
+    if validators is not None:
+        headers = conditional_headers(validators, headers)
+    async with get_session().get(url, headers=headers, **kwargs) as response:
+        if response.status == 304 and validators is not None:
+            return False
+        response.raise_for_status()
+        if validators is not None:
+            update_validators(validators, response)
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            if consume(decoder.decode(chunk)):
+                return True
+        consume(decoder.decode(b"", final=True), final=True)
+        return True
@@ -0,0 +1,173 @@
+# utils/inline.py
+
+import asyncio
+import re
+from datetime import datetime
+from aiogram.types import InlineQueryResultArticle, InputTextMessageContent
+from db.storage import get_latest_rate
+from utils.compare import format_comparison
+from utils.breaker import get_breaker, load_breakers, CLOSED
+from utils.parsers import SOURCES, find_source, sources_for
+
+INLINE_CURRENCIES = ("USD", "EUR", "GBP", "PLN")  # Показуються на порожній запит
+MAX_INLINE_RESULTS = 50  # Ліміт Telegram на одну відповідь
+AMOUNT_RE = re.compile(r"^\d+(?:[.,]\d+)?$")
+
+
+def match_source(token):
+    """
+    Джерело за назвою або її початком ("privat", "mono"); початок — від 4 літер,
+    щоб не сплутати з кодом валюти. None, якщо збігу немає або він неоднозначний.
+    """
+    source = find_source(token)
+    if source or len(token) < 4:
+        return source
+    token = token.lower()
+    found = [
+        item for item in SOURCES.values()
+        if item.name.lower().startswith(token) or item.title.lower().startswith(token)
+    ]
+    return found[0] if len(found) == 1 else None
+
+
+def parse_inline_query(text):
+    """
+    Розбирає інлайн-запит у довільному порядку: "usd", "eur privat", "100 usd".
+    Повертає (amount або None, currency або None, Source або None);
+    ValueError, якщо в запиті є незрозумілі слова.
+    """
+    amount = currency = source = None
+    for token in text.split():
+        if AMOUNT_RE.match(token):
+            amount = float(token.replace(",", "."))
+        elif match_source(token):
+            source = match_source(token)
+        elif len(token) == 3 and token.isalpha():
+            currency = token.upper()
+        else:
+            raise ValueError(token)
+    return amount, currency, source
+
+
+def format_amount(value):
+    return f"{value:,.2f}".replace(",", " ")
+
+
+def article(result_id, title, description, text):
+    return InlineQueryResultArticle(
+        id=result_id,
+        title=title,
+        description=description,
+        input_message_content=InputTextMessageContent(message_text=text),
+    )
+
+
+class InlineAnswers:
+    """
+    Готові відповіді для інлайн-режиму (@bot usd), щоб запит обслуговувався
+    без звернень до БД і банків.
+    rates — останні курси {currency: {source: (rate, date)}} у пам'яті
+    answers — результати, зібрані заздалегідь для (currency, source або None)
+    Відповіді перебудовуються для валют, що прийшли в новому знімку
+    (add_rate_listener); курси, зібрані іншими репліками, дочитує refresh().
+    """
+
+    def __init__(self):
+        self.rates = {}
+        self.answers = {}
+
+    def set_rate(self, currency, source, rate, date):
+        known = self.rates.setdefault(currency, {})
+        if source not in known or known[source][1] <= date:  # Старіший курс з БД не затирає новий знімок
+            known[source] = (rate, date)
+
+    def comparison(self, currency):
+        """Курси валюти в порядку реєстрації джерел: (Source, rate, stale), як у compare_rates."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        known = self.rates.get(currency, {})
+        results = []
+        for source in sources_for(currency):
+            if source.name in known:
+                rate, date = known[source.name]
+                stale = date < today or get_breaker(source.name).state != CLOSED
+                results.append((source, rate, date if stale else None))
+        return results
+
+    def build(self, currency):
+        """Перебудовує готові відповіді для однієї валюти."""
+        comparison = self.comparison(currency)
+        if not comparison:
+            return
+        text = format_comparison(currency, [(source.title, rate, stale) for source, rate, stale in comparison])
+        summary = ", ".join(f"{source.title} {rate}" for source, rate, _ in comparison)
+        overview = article(currency, f"Курс {currency} у всіх джерелах", summary, text)
+        self.answers[(currency, None)] = [overview]
+        for source, rate, stale in comparison:
+            text = f"Курс {currency} ({source.title}): {rate} грн"
+            if stale:
+                text += f"\n⚠️ дані від {stale}"
+            single = article(f"{currency}:{source.name}", f"{currency} — {source.title}", f"{rate} грн", text)
+            self.answers[(currency, None)].append(single)
+            self.answers[(currency, source.name)] = [single]
+
+    def convert(self, amount, currency, source=None):
+        """Переведення суми в гривні за курсами з пам'яті (сума довільна, тож рахується на запит)."""
+        results = []
+        for item, rate, stale in self.comparison(currency):
+            if source is not None and item.name != source.name:
+                continue
+            total = format_amount(amount * rate)
+            text = f"{format_amount(amount)} {currency} = {total} грн ({item.title}, курс {rate})"
+            if stale:
+                text += f"\n⚠️ дані від {stale}"
+            results.append(article(
+                f"{amount:g}:{currency}:{item.name}", f"{format_amount(amount)} {currency} = {total} грн",
+                f"{item.title}, курс {rate}", text,
+            ))
+        return results
+
+    def answer(self, query):
+        """Результати для тексту інлайн-запиту; лише пам'ять, без I/O."""
+        try:
+            amount, currency, source = parse_inline_query(query)
+        except ValueError:
+            return []
+        if currency is None:
+            if amount is None and source is None:
+                results = []
+                for code in INLINE_CURRENCIES:
+                    results += self.answers.get((code, None), [])[:1]
+                return results
+            currency = "USD"  # "100" або "privat" — за замовчуванням долар
+        if amount is not None:
+            return self.convert(amount, currency, source)[:MAX_INLINE_RESULTS]
+        return self.answers.get((currency, source.name if source else None), [])[:MAX_INLINE_RESULTS]
+
+    async def on_snapshot(self, snapshot):
+        """Обробник нових курсів (utils.parsers.add_rate_listener)."""
+        for currency, rate in snapshot.rates.items():
+            self.set_rate(currency, snapshot.source, rate, snapshot.date)
+        for currency in snapshot.rates:
+            self.build(currency)
+
+    async def refresh(self):
+        """
+        Перечитує з БД останні курси валют, що вже є в пам'яті, і INLINE_CURRENCIES,
+        та стан запобіжників джерел.
+        Виконується при старті і за розкладом, а не під час інлайн-запиту.
+        """
+        try:
+            await load_breakers()  # Позначки застарілих даних — за спільним станом запобіжників
+            currencies = set(INLINE_CURRENCIES) | set(self.rates)
+            pairs = [(currency, source.name) for currency in currencies for source in sources_for(currency)]
+            rows = await asyncio.gather(*(get_latest_rate(currency, name) for currency, name in pairs))
+            for (currency, name), latest in zip(pairs, rows):
+                if latest:
+                    self.set_rate(currency, name, *latest)
+            for currency in currencies:
+                self.build(currency)
+        except Exception as e:
+            print(f"Помилка при оновленні інлайн-відповідей: {e}")
+
+
+inline_answers = InlineAnswers()
@@ -0,0 +1,141 @@
+# utils/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Верхні межі кошиків гістограм часу (секунди)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()  # Метрики оновлюються і з потоків БД та рендерингу
+_registry = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace("\\", "\\\\").replace('"', '\\"')) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Counter:
+    """Лічильник, що лише зростає (наприклад, кількість помилок)."""
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """Поточне значення лічильника для набору міток."""
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with _lock:
+            return self._values.get(key, 0)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {value}"
+
+
+class Histogram:
+    """Гістограма значень (час запитів, рендерингу тощо) з кумулятивними кошиками."""
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [counts по кошиках, sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Контекстний менеджер: вимірює час виконання блоку."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, **labels):
+        """Повертає (кількість спостережень, сума значень) для набору міток."""
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with _lock:
+            state = self._values.get(key)
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, [("le", bound)])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+def render():
+    """Повертає всі метрики у текстовому форматі Prometheus."""
+    with _lock:
+        lines = [line for metric in _registry for line in metric.collect()]
+    return "\n".join(lines) + "\n"
+
+
+# --- Метрики бота ---
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_seconds", "Час запиту і розбору відповіді джерела курсів", ["source"]
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Кількість невдалих запитів до джерела курсів", ["source"]
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_seconds", "Час виконання функцій db/queries.py", ["function"]
+)
+HANDLER_LATENCY = Histogram(
+    "handler_seconds", "Час обробки команди бота", ["command"]
+)
+CHART_RENDER_LATENCY = Histogram(
+    "chart_render_seconds", "Час рендерингу графіка"
+)
+BREAKER_TRANSITIONS = Counter(
+    "breaker_transitions_total", "Переходи запобіжника джерела між станами", ["source", "state"]
+)
+UPSTREAM_RESPONSES = Counter(
+    "upstream_responses_total",
+    "Відповіді джерела курсів: changed, not_modified (304) або same_hash (те саме тіло, розбір пропущено)",
+    ["source", "result"],
+)
+RATE_CHANGES = Counter(
+    "rate_changes_total", "Курси, що змінились і були записані в БД (решта записів пропускається)", ["source"]
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Звернення до кешів: hit, miss або coalesced (очікування спільного завантаження)",
+    ["cache", "result"],
+)
@@ -0,0 +1,49 @@
+# utils/minfin.py
+
+import re
+
+# Курс продажу на сторінці валюти Мінфіну — перший div з класом sc-1x32wa2-9
+# (той самий маркер, що шукав старий розбір через BeautifulSoup). Регулярний
+# вираз знаходить його без побудови DOM.
+RATE_RE = re.compile(r'<div[^>]{0,200}?class="[^"<>]{0,200}?sc-1x32wa2-9[^"<>]{0,200}?"[^>]{0,200}>\s*(\d+[.,]\d+)')
+OVERLAP = 2048  # Хвіст буфера, в якому може бути обрізаний маркер (довший за будь-який збіг)
+
+
+class MinfinExtractor:
+    """
+    Потоково витягує курс зі сторінки валюти Мінфіну (/ua/currency/usd/).
+    feed() приймає шматки тексту й повертає True, щойно курс знайдено, —
+    далі сторінку можна не завантажувати.
+    rates — {код валюти: курс} або порожній словник, поки курс не знайдено
+    """
+
+    def __init__(self, currency):
+        self.currency = currency
+        self.rates = {}
+        self._buffer = ""
+
+    def feed(self, text, final=False):
+        if self.done():
+            return True
+        buffer = self._buffer + text
+        match = RATE_RE.search(buffer)
+        # Збіг, що закінчується в хвості буфера, може бути неповним (обрізані цифри)
+        if match and (final or match.end() <= len(buffer) - OVERLAP):
+            self.rates[self.currency] = float(match.group(1).replace(",", "."))
+            self._buffer = ""
+            return True
+        self._buffer = buffer if match else buffer[-OVERLAP:]
+        return False
+
+    def done(self):
+        return self.currency in self.rates
+
+
+def extract_rates(html, currency, chunk_size=16384):
+    """Витягує курс з уже завантаженого HTML (той самий потоковий розбір)."""
+    extractor = MinfinExtractor(currency)
+    for start in range(0, len(html), chunk_size):
+        if extractor.feed(html[start:start + chunk_size]):
+            return extractor.rates
+    extractor.feed("", final=True)
+    return extractor.rates
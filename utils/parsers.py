@@ -1,164 +1,284 @@
 # utils/parsers.py
 
-import requests
+import hashlib
+import json
+from dataclasses import dataclass, field
 from datetime import datetime
-from db.queries import add_rate
+from db.storage import add_rates
+from utils import health
+from utils.breaker import HALF_OPEN, get_breaker, load_breakers, save_breaker
+from utils.http import fetch_conditional, fetch_stream
+from utils.metrics import UPSTREAM_LATENCY, UPSTREAM_ERRORS, UPSTREAM_RESPONSES, RATE_CHANGES
+from utils.minfin import MinfinExtractor
 
 # --- Константи з URL-адресами для різних джерел ---
 NBU_API_URL = "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?json"
+NBU_HISTORY_URL = "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?date={date}&json"
 PRIVAT_API_URL = "https://api.privatbank.ua/p24api/pubinfo?json&exchange&coursid=5"
 MONO_API_URL = "https://api.monobank.ua/bank/currency"
 MINFIN_URL = "https://minfin.com.ua/ua/currency/usd/"
 
-REQUEST_TIMEOUT = 5  # Таймаут для HTTP-запитів у секундах
 
-# --- Парсер курсу USD з НБУ ---
+# --- Реєстр джерел ---
 
 
-def get_usd_nbu():
+@dataclass(frozen=True)
+class Source:
     """
-    Отримати курс USD з НБУ API та зберегти в БД.
+    Опис джерела курсів.
+    name — ідентифікатор джерела в БД
+    title — назва для користувача
+    url — адреса, з якої одним запитом завантажуються всі курси
+    parse — функція, що витягує з відповіді {код валюти: курс}
+            (для fmt="stream" — фабрика потокового екстрактора з feed() і rates)
+    currencies — валюти, які віддає джерело (None — будь-які, що є у відповіді)
+    fmt — формат відповіді: "json" або "stream" (HTML, що читається шматками)
     """
-    try:
-        response = requests.get(NBU_API_URL, timeout=REQUEST_TIMEOUT)
-        data = response.json()
-        for item in data:
-            if item["cc"] == "USD":
-                rate = item["rate"]
-                date = datetime.now().strftime("%Y-%m-%d")
-                add_rate(date, "USD", "NBU", rate)  # Зберігаємо в БД
-                return rate, date
-    except Exception as e:
-        print(f"Помилка при запиті до NBU (USD): {e}")
-    return None, None
+    name: str
+    title: str
+    url: str
+    parse: object
+    currencies: tuple = None
+    fmt: str = "json"
+    headers: dict = field(default_factory=dict)
+
+    def supports(self, currency):
+        return self.currencies is None or currency in self.currencies
+
+
+SOURCES = {}  # name -> Source (у порядку реєстрації)
+
 
-# --- Парсер курсу USD з ПриватБанку ---
+def register_source(source):
+    """Додає джерело до реєстру."""
+    SOURCES[source.name] = source
+    return source
 
 
-def get_usd_privat():
+def sources_for(currency):
+    """Повертає всі джерела, що надають курс валюти."""
+    return [source for source in SOURCES.values() if source.supports(currency)]
+
+
+def find_source(name):
+    """Знаходить джерело за ідентифікатором або назвою без урахування регістру (None, якщо немає)."""
+    name = name.lower()
+    for source in SOURCES.values():
+        if name in (source.name.lower(), source.title.lower()):
+            return source
+    return None
+
+
+class RateSnapshot:
     """
-    Отримати курс USD з ПриватБанку API та зберегти в БД.
+    Розібрана відповідь джерела з індексом за кодом валюти.
+    rates — словник {код валюти: курс}
+    date — дата отримання знімка у форматі YYYY-MM-DD
+    previous — для подій зміни (add_rate_listener): попередні курси змінених
+               валют {код валюти: курс або None, якщо курсу ще не було}
     """
-    try:
-        response = requests.get(PRIVAT_API_URL, timeout=REQUEST_TIMEOUT)
-        data = response.json()
-        for item in data:
-            if item["ccy"] == "USD" and item["base_ccy"] == "UAH":
-                rate = float(item["sale"])
-                date = datetime.now().strftime("%Y-%m-%d")
-                add_rate(date, "USD", "PrivatBank", rate)
-                return rate, date
-    except Exception as e:
-        print(f"Помилка при запиті до ПриватБанку (USD): {e}")
-    return None, None
 
-# --- Парсер курсу USD з Monobank ---
+    def __init__(self, source, rates, date, previous=None):
+        self.source = source
+        self.rates = rates
+        self.date = date
+        self.previous = previous or {}
+
+    def get(self, currency):
+        return self.rates.get(currency)
+
+    def currencies(self):
+        return sorted(self.rates)
+
+# --- Парсери відповідей ---
+
+
+def parse_nbu(data):
+    """НБУ: усі валюти з фіду, індексовані за полем cc."""
+    return {item["cc"]: item["rate"] for item in data if "cc" in item and "rate" in item}
+
+
+def parse_privat(data):
+    """ПриватБанк: курс продажу для валют з базою UAH."""
+    return {
+        item["ccy"]: float(item["sale"])
+        for item in data
+        if item.get("base_ccy") == "UAH" and item.get("sale")
+    }
+
+
+# Числові коди ISO 4217, які віддає Monobank
+MONO_CURRENCY_CODES = {840: "USD", 978: "EUR", 826: "GBP", 985: "PLN"}
+MONO_UAH_CODE = 980
 
 
-def get_usd_mono():
+def parse_mono(data):
+    """Monobank: курси до гривні (currencyCodeB=980) для відомих валют."""
+    rates = {}
+    for item in data:
+        currency = MONO_CURRENCY_CODES.get(item.get("currencyCodeA"))
+        if currency and item.get("currencyCodeB") == MONO_UAH_CODE:
+            rate = item.get("rateSell") or item.get("rateCross")
+            if rate:
+                rates[currency] = rate
+    return rates
+
+
+def parse_minfin():
     """
-    Отримати курс USD з Monobank API та зберегти в БД.
+    Мінфін: потоковий екстрактор курсу USD зі сторінки валюти (може змінюватись верстка!).
+    Лише USD: розмітку інших валют на сторінці не перевірено (див. README, «Бенчмарки»).
     """
-    try:
-        response = requests.get(MONO_API_URL, timeout=REQUEST_TIMEOUT)
-        data = response.json()
-        # USD: currencyCodeA=840, currencyCodeB=980 (UAH)
-        for item in data:
-            if item.get("currencyCodeA") == 840 and item.get("currencyCodeB") == 980:
-                rate = item.get("rateSell") or item.get("rateCross")
-                if rate:
-                    date = datetime.now().strftime("%Y-%m-%d")
-                    add_rate(date, "USD", "Monobank", rate)
-                    return rate, date
-    except Exception as e:
-        print(f"Помилка при запиті до Monobank (USD): {e}")
-    return None, None
+    return MinfinExtractor("USD")
+
 
-# --- Парсер курсу USD з Мінфін (HTML-парсинг) ---
+register_source(Source("NBU", "НБУ", NBU_API_URL, parse_nbu))
+register_source(Source("PrivatBank", "ПриватБанк", PRIVAT_API_URL, parse_privat, ("USD", "EUR")))
+register_source(Source("Monobank", "Монобанк", MONO_API_URL, parse_mono, tuple(MONO_CURRENCY_CODES.values())))
+register_source(Source(
+    "Minfin", "Мінфін", MINFIN_URL, parse_minfin, ("USD",),
+    fmt="stream", headers={"User-Agent": "Mozilla/5.0"},
+))
 
+# --- Завантаження курсів ---
 
-def get_usd_minfin():
+
+@dataclass
+class SourceState:
     """
-    Отримати курс USD з сайту Мінфін (HTML-парсинг) та зберегти в БД.
+    Що відомо про останню відповідь джерела.
+    validators — ETag і Last-Modified для умовного запиту
+    digest — хеш тіла останньої розібраної JSON-відповіді
+    rates — курси, розібрані з неї
+    saved — останні записані в БД курси {код валюти: (курс, дата)}
     """
-    try:
-        from bs4 import BeautifulSoup
-        response = requests.get(MINFIN_URL, headers={
-                                "User-Agent": "Mozilla/5.0"}, timeout=REQUEST_TIMEOUT)
-        soup = BeautifulSoup(response.text, "html.parser")
-        # Знаходимо перший курс продажу USD (може змінюватись верстка!)
-        rate_tag = soup.find("div", class_="sc-1x32wa2-9")
-        if rate_tag:
-            try:
-                rate = float(rate_tag.text.replace(",", "."))
-                date = datetime.now().strftime("%Y-%m-%d")
-                add_rate(date, "USD", "Minfin", rate)
-                return rate, date
-            except Exception as e:
-                print(f"Помилка при парсингу курсу з Мінфін: {e}")
-    except Exception as e:
-        print(f"Помилка при запиті до Мінфін (USD): {e}")
-    return None, None
+    validators: dict = field(default_factory=dict)
+    digest: str = None
+    rates: dict = None
+    saved: dict = field(default_factory=dict)
+
+
+_source_states = {}  # name -> SourceState
 
-# --- Парсер курсу EUR з НБУ ---
 
+def get_source_state(name):
+    state = _source_states.get(name)
+    if state is None:
+        state = _source_states[name] = SourceState()
+    return state
 
-def get_eur_nbu():
+
+async def fetch_rates(source, state):
     """
-    Отримати курс EUR з НБУ API та зберегти в БД.
+    Курси джерела {код валюти: курс}. Запит умовний: на 304 Not Modified або тіло
+    з тим самим хешем повертаються вже розібрані курси без повторного розбору.
     """
-    try:
-        response = requests.get(NBU_API_URL, timeout=REQUEST_TIMEOUT)
-        data = response.json()
-        for item in data:
-            if item["cc"] == "EUR":
-                rate = item["rate"]
-                date = datetime.now().strftime("%Y-%m-%d")
-                add_rate(date, "EUR", "NBU", rate)
-                return rate, date
-    except Exception as e:
-        print(f"Помилка при запиті до NBU (EUR): {e}")
-    return None, None
+    validators = dict(state.validators)  # Зберігаються лише після успішного розбору
+    if source.fmt == "stream":
+        # Сторінка читається шматками і лише до місця, де знайдено всі курси
+        extractor = source.parse()
+        if not await fetch_stream(source.url, extractor.feed, validators=validators, headers=source.headers):
+            UPSTREAM_RESPONSES.inc(source=source.name, result="not_modified")
+            return state.rates or {}
+        rates, digest = extractor.rates, None
+    else:
+        body = await fetch_conditional(source.url, validators, headers=source.headers)
+        if body is None:
+            UPSTREAM_RESPONSES.inc(source=source.name, result="not_modified")
+            return state.rates or {}
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if digest == state.digest:
+            UPSTREAM_RESPONSES.inc(source=source.name, result="same_hash")
+            state.validators = validators
+            return state.rates
+        # Деякі API віддають JSON з неправильним Content-Type, тож тіло розбирається напряму
+        rates = source.parse(json.loads(body))
+    UPSTREAM_RESPONSES.inc(source=source.name, result="changed")
+    if source.currencies is not None:
+        rates = {cc: rate for cc, rate in rates.items() if cc in source.currencies}
+    state.validators, state.digest, state.rates = validators, digest, rates
+    return rates
 
-# --- Парсер курсу GBP з НБУ ---
 
+async def fetch_source(source):
+    """Один запит до джерела і розбір усіх його курсів у RateSnapshot."""
+    rates = await fetch_rates(source, get_source_state(source.name))
+    return RateSnapshot(source.name, rates, datetime.now().strftime("%Y-%m-%d"))
 
-def get_gbp_nbu():
+
+async def get_snapshot(name):
     """
-    Отримати курс GBP з НБУ API та зберегти в БД.
+    Завантажує знімок курсів джерела (викликається лише фоновим збором).
+    Поки запобіжник джерела відкритий, запит не робиться зовсім і повертається None.
+    Стан запобіжника читається зі сховища і зберігається туди ж, тож його бачать
+    усі репліки, а новий лідер збору продовжує з того самого стану.
     """
+    await load_breakers()
+    breaker = get_breaker(name)
+    if not breaker.allow():
+        return None
+    if breaker.state == HALF_OPEN:
+        await save_breaker(breaker)  # Інші репліки бачать, що проба вже триває
+    saved = breaker.to_dict()
     try:
-        response = requests.get(NBU_API_URL, timeout=REQUEST_TIMEOUT)
-        data = response.json()
-        for item in data:
-            if item["cc"] == "GBP":
-                rate = item["rate"]
-                date = datetime.now().strftime("%Y-%m-%d")
-                add_rate(date, "GBP", "NBU", rate)
-                return rate, date
+        with UPSTREAM_LATENCY.time(source=name):
+            snapshot = await fetch_source(SOURCES[name])
+        if not snapshot.rates:
+            # Порожня відповідь — найчастіше змінена верстка або формат API
+            raise ValueError("у відповіді не знайдено жодного курсу")
+        breaker.record_success()
+        return snapshot
     except Exception as e:
-        print(f"Помилка при запиті до NBU (GBP): {e}")
-    return None, None
+        UPSTREAM_ERRORS.inc(source=name)
+        breaker.record_failure(str(e))
+        print(f"Помилка при запиті до {name}: {e}")
+        return None
+    finally:
+        breaker.release()  # Скасована проба не лишає запобіжник у HALF_OPEN
+        if breaker.to_dict() != saved:
+            await save_breaker(breaker)
+
 
-# --- Парсер курсу PLN з НБУ ---
+_rate_listeners = []
 
 
-def get_pln_nbu():
+def add_rate_listener(listener):
     """
-    Отримати курс PLN з НБУ API та зберегти в БД.
+    Реєструє async-обробник listener(snapshot) подій зміни курсів. Він викликається
+    після збереження зі знімком, у якому лише змінені курси (новий курс або
+    перший курс за новий день), а snapshot.previous містить попередні значення.
     """
-    try:
-        response = requests.get(NBU_API_URL, timeout=REQUEST_TIMEOUT)
-        data = response.json()
-        for item in data:
-            if item["cc"] == "PLN":
-                rate = item["rate"]
-                date = datetime.now().strftime("%Y-%m-%d")
-                add_rate(date, "PLN", "NBU", rate)
-                return rate, date
-    except Exception as e:
-        print(f"Помилка при запиті до NBU (PLN): {e}")
-    return None, None
+    _rate_listeners.append(listener)
+    return listener
+
 
-# --- Тут можна додати парсери для інших валют і джерел ---
-# Можна додати парсинг з інших джерел (наприклад, Мінфін) через BeautifulSoup
\ No newline at end of file
+async def collect_source(name):
+    """
+    Оновлює курси джерела і зберігає в БД однією транзакцією лише ті,
+    що змінились з останнього збереження; про них сповіщає обробники з add_rate_listener.
+    Якщо нічого не змінилось, запису в БД і подій немає.
+    """
+    snapshot = await get_snapshot(name)
+    if snapshot is None or not snapshot.rates:
+        return None
+    state = get_source_state(name)
+    changed = {
+        currency: rate for currency, rate in snapshot.rates.items()
+        if state.saved.get(currency) != (rate, snapshot.date)
+    }
+    if not changed:
+        health.set_ready("rates")  # Ці курси вже збережено раніше
+        return snapshot
+    if not await add_rates([(snapshot.date, currency, name, rate) for currency, rate in changed.items()]):
+        return snapshot  # Не записано — наступний збір спробує ще раз
+    health.set_ready("rates")
+    RATE_CHANGES.inc(len(changed), source=name)
+    previous = {currency: state.saved.get(currency, (None, None))[0] for currency in changed}
+    state.saved.update((currency, (rate, snapshot.date)) for currency, rate in changed.items())
+    event = RateSnapshot(name, changed, snapshot.date, previous)
+    for listener in _rate_listeners:
+        try:
+            await listener(event)
+        except Exception as e:
+            print(f"Помилка обробника нових курсів {name}: {e}")
+    return snapshot
@@ -0,0 +1,99 @@
+# utils/scheduler.py
+
+import asyncio
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from config import COLLECT_INTERVALS, DEFAULT_COLLECT_INTERVAL, STATS_FLUSH_INTERVAL, BROADCAST_TIME
+from db.storage import acquire_lock, get_latest_rate
+from middlewares.stats import stats
+from utils.broadcast import send_daily_broadcast
+from utils import health
+from utils.inline import inline_answers
+from utils.parsers import SOURCES, collect_source
+from utils.timeseries import store as timeseries
+
+
+BROADCAST_LOCK_TTL = 3600  # Розсилку за день запускає лише одна репліка
+READY_CHECK_INTERVAL = 15  # Як часто репліка без збору курсів перевіряє, чи вони вже є у сховищі (секунди)
+
+
+async def run_exclusive(name, ttl, func, *args):
+    """
+    Виконує задачу, лише якщо ця репліка взяла блокування name на ttl секунд.
+    Блокування не знімається після виконання: інші репліки, чий планувальник
+    спрацює трохи пізніше, пропустять той самий запуск.
+    """
+    if not await acquire_lock(name, ttl):
+        return None
+    return await func(*args)
+
+
+def collect_lock_ttl(name):
+    # Трохи менше за інтервал, щоб наступний запуск лідера не пропускався
+    return max(COLLECT_INTERVALS.get(name, DEFAULT_COLLECT_INTERVAL) * 0.9, 1)
+
+
+async def warm_up_rates():
+    """Паралельно виконує перший збір з усіх джерел (при старті бота)."""
+    await asyncio.gather(*(
+        run_exclusive(f"collect:{name}", collect_lock_ttl(name), collect_source, name)
+        for name in SOURCES
+    ))
+    await check_rates_ready()
+
+
+async def check_rates_ready():
+    """
+    Позначає курси готовими, якщо їх уже зібрала інша репліка: ця обслуговує запити
+    зі спільного сховища, навіть не взявши жодного блокування збору.
+    Виконується при старті і за розкладом, поки курси не готові.
+    """
+    if not health.is_ready("rates") and await get_latest_rate("USD", "NBU"):
+        health.set_ready("rates")
+
+
+def create_scheduler(bot):
+    """
+    Створює планувальник, що опитує кожне зареєстроване джерело з власним інтервалом
+    і щодня надсилає розсилку підписникам. Збір і розсилку серед усіх реплік
+    виконує лише та, що взяла блокування у спільному сховищі.
+    Перший збір виконує main.py одразу при старті (див. warm_up_rates).
+    """
+    scheduler = AsyncIOScheduler()
+    for name in SOURCES:
+        scheduler.add_job(
+            run_exclusive,
+            "interval",
+            args=[f"collect:{name}", collect_lock_ttl(name), collect_source, name],
+            seconds=COLLECT_INTERVALS.get(name, DEFAULT_COLLECT_INTERVAL),
+            id=f"collect_{name}",
+            max_instances=1,
+            coalesce=True,
+        )
+    # Готовність репліки, що не збирає курси сама
+    scheduler.add_job(
+        check_rates_ready, "interval", seconds=READY_CHECK_INTERVAL, id="check_rates_ready",
+        max_instances=1, coalesce=True,
+    )
+    # Часові ряди в пам'яті дочитують курси, зібрані іншими репліками
+    scheduler.add_job(
+        timeseries.refresh, "interval", seconds=min(COLLECT_INTERVALS.values()), id="refresh_timeseries",
+        max_instances=1, coalesce=True,
+    )
+    # Інлайн-відповіді: курси інших реплік і позначки застарілих даних
+    scheduler.add_job(
+        inline_answers.refresh, "interval", seconds=min(COLLECT_INTERVALS.values()), id="refresh_inline",
+        max_instances=1, coalesce=True,
+    )
+    # Періодичне скидання статистики команд у БД
+    scheduler.add_job(
+        stats.flush, "interval", seconds=STATS_FLUSH_INTERVAL, id="flush_stats",
+        max_instances=1, coalesce=True,
+    )
+    # Щоденна розсилка підписникам
+    hour, minute = BROADCAST_TIME.split(":")
+    scheduler.add_job(
+        run_exclusive, "cron", args=["broadcast", BROADCAST_LOCK_TTL, send_daily_broadcast, bot],
+        hour=int(hour), minute=int(minute),
+        id="daily_broadcast", max_instances=1, coalesce=True,
+    )
+    return scheduler
@@ -0,0 +1,51 @@
+# utils/startup.py
+
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Імпорт самого main.py тягне рівно те, що завантажується при старті бота (main() не запускається)
+STARTUP_MODULES = ["main"]
+ROOT = Path(__file__).resolve().parent.parent  # Корінь репозиторію, звідки імпортується main
+# Важкі залежності, які мають завантажуватись ліниво
+LAZY_MODULES = ["matplotlib", "numpy"]
+
+
+def measure_imports(modules=STARTUP_MODULES):
+    """
+    Імпортує модулі в окремому «холодному» процесі з -X importtime і повертає
+    (загальний час у мс, {пакет верхнього рівня: мс}, множина завантажених пакетів).
+    """
+    code = "import " + ", ".join(modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    packages = defaultdict(float)
+    loaded = set()
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        loaded.add(package)
+        # Власний час модуля (без вкладених імпортів) сумується по пакету
+        ms = int(self_us) / 1000
+        packages[package] += ms
+        total += ms
+    if proc.returncode != 0:
+        print(proc.stderr.strip().splitlines()[-1])
+    return total, dict(packages), loaded
+
+
+def report_startup(top=15):
+    """Друкує розбивку часу імпорту при старті (python main.py --profile-startup)."""
+    total, packages, loaded = measure_imports()
+    print(f"Час імпорту модулів при старті: {total:.0f} мс")
+    for package, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {package:<24} {ms:8.1f} мс")
+    for package in LAZY_MODULES:
+        status = "завантажується при старті ⚠️" if package in loaded else "лінивий ✅"
+        print(f"  {package}: {status}")
@@ -0,0 +1,224 @@
+# utils/timeseries.py
+
+import asyncio
+import importlib
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from db.storage import get_rate_writes, get_rates_since, get_rates_watermark
+
+
+def _numpy():
+    # numpy імпортується ліниво, як і matplotlib: при старті бота він не потрібен
+    import numpy
+    return numpy
+
+
+class Series:
+    """
+    Історія курсу однієї пари (валюта, джерело) у двох масивах:
+    days — номери днів (date.toordinal) як int32, rates — курси як float64,
+    тобто 12 байт на точку. Дні відсортовані й унікальні: повторний курс
+    за той самий день замінює попередній (як upsert у таблиці rates).
+    """
+
+    __slots__ = ("days", "rates")
+
+    def __init__(self):
+        self.days = array("i")
+        self.rates = array("d")
+
+    def __len__(self):
+        return len(self.days)
+
+    def add(self, day, rate):
+        if not self.days or day > self.days[-1]:
+            self.days.append(day)  # Звичайний випадок: новий день у кінці
+            self.rates.append(rate)
+            return
+        index = bisect_left(self.days, day)
+        if self.days[index] == day:
+            self.rates[index] = rate
+        else:
+            self.days.insert(index, day)
+            self.rates.insert(index, rate)
+
+    def window(self, start_day=None, end_day=None):
+        """
+        Повертає (days, rates) як numpy-масиви для днів у [start_day, end_day].
+        Межі шукаються двійковим пошуком, копіюється лише сам зріз — масиви
+        сховища лишаються вільними для дописування.
+        """
+        np = _numpy()
+        low = 0 if start_day is None else bisect_left(self.days, start_day)
+        high = len(self.days) if end_day is None else bisect_right(self.days, end_day)
+        days = np.frombuffer(self.days, dtype=np.int32)[low:high].copy()
+        rates = np.frombuffer(self.rates, dtype=np.float64)[low:high].copy()
+        return days, rates
+
+    def nbytes(self):
+        return self.days.buffer_info()[1] * self.days.itemsize + self.rates.buffer_info()[1] * self.rates.itemsize
+
+
+class TimeSeriesStore:
+    """
+    Уся історія курсів у пам'яті для читання без SQL.
+    Завантажується при старті, доповнюється кожним новим знімком курсів
+    (add_rate_listener) і періодично дочитує курси, зібрані іншими репліками.
+    """
+
+    def __init__(self):
+        self.series = {}  # (currency, source) -> Series
+        self.watermark = 0  # Номер останнього запису курсів у сховищі, відображеного в пам'яті
+        self.loaded = False
+        self._pending = None  # Курси, що надійшли під час завантаження
+
+    def add(self, date_str, currency, source, rate):
+        if self._pending is not None:
+            self._pending.append((date_str, currency, source, rate))
+        series = self.series.get((currency, source))
+        if series is None:
+            series = self.series[(currency, source)] = Series()
+        series.add(date.fromisoformat(date_str).toordinal(), rate)
+
+    def add_rows(self, rows):
+        for date_str, currency, source, rate in rows:
+            self.add(date_str, currency, source, rate)
+
+    async def load(self):
+        """Завантажує всю історію зі сховища (один запит при старті бота)."""
+        try:
+            await asyncio.to_thread(importlib.import_module, "numpy")
+            self._pending = []
+            # Позначка — до читання: записи між ними refresh() дочитає ще раз, це безпечно
+            watermark = await get_rates_watermark()
+            if watermark is None:
+                raise RuntimeError("не вдалося прочитати номер запису курсів")
+            rows = await get_rates_since("")
+            pending, self._pending = self._pending, None
+            self.series = {}
+            self.add_rows(rows)  # Рядки відсортовані за датою: лише дописування в кінець
+            self.add_rows(pending)
+            self.watermark = watermark
+            self.loaded = True
+            print(f"Часові ряди завантажено: {self.points()} точок, {self.nbytes() // 1024} КБ")
+        except Exception as e:
+            self._pending = None
+            print(f"Помилка при завантаженні часових рядів: {e}")
+
+    async def refresh(self):
+        """
+        Дочитує курси, записані після позначки: нові й перезаписані, зокрема за минулі
+        дати (--backfill, --import) і ті, що зібрала інша репліка.
+        Якщо перше завантаження не вдалось, повторює його.
+        """
+        if not self.loaded:
+            if self._pending is None:  # Завантаження зараз не триває
+                await self.load()
+            return
+        writes = await get_rate_writes(self.watermark)
+        if not writes:
+            return
+        self.watermark = max(written for written, *_ in writes)
+        # За датою: нові дні дописуються в кінець, вставки в середину — лише для минулих дат
+        self.add_rows(sorted(row for _, *row in writes))
+
+    async def on_snapshot(self, snapshot):
+        """Обробник нових курсів (utils.parsers.add_rate_listener)."""
+        for currency, rate in snapshot.rates.items():
+            self.add(snapshot.date, currency, snapshot.source, rate)
+
+    def get(self, currency, source):
+        return self.series.get((currency, source))
+
+    def points(self):
+        return sum(len(series) for series in self.series.values())
+
+    def nbytes(self):
+        return sum(series.nbytes() for series in self.series.values())
+
+
+store = TimeSeriesStore()
+
+# --- Статистика ---
+
+
+@dataclass(frozen=True)
+class RateStats:
+    """Статистика курсу за період (volatility — стандартне відхилення денної зміни, %)."""
+    points: int
+    first_date: str
+    last_date: str
+    first: float
+    last: float
+    change_pct: float
+    low: float
+    low_date: str
+    high: float
+    high_date: str
+    mean: float
+    ma7: float
+    ma30: float
+    volatility: float
+
+
+def moving_average(rates, window):
+    """Ковзне середнє за window точок (масив довжиною len(rates) - window + 1)."""
+    np = _numpy()
+    if len(rates) < window:
+        return np.empty(0)
+    sums = np.cumsum(np.insert(rates, 0, 0.0))
+    return (sums[window:] - sums[:-window]) / window
+
+
+def compute_stats(days, rates):
+    """Рахує RateStats для зрізу Series.window(); None, якщо точок немає."""
+    if len(rates) == 0:
+        return None
+    np = _numpy()
+    low, high = int(np.argmin(rates)), int(np.argmax(rates))
+    ma7 = moving_average(rates, 7)
+    ma30 = moving_average(rates, 30)
+    returns = np.diff(np.log(rates))
+    return RateStats(
+        points=len(rates),
+        first_date=date.fromordinal(int(days[0])).isoformat(),
+        last_date=date.fromordinal(int(days[-1])).isoformat(),
+        first=float(rates[0]),
+        last=float(rates[-1]),
+        change_pct=float((rates[-1] / rates[0] - 1) * 100),
+        low=float(rates[low]),
+        low_date=date.fromordinal(int(days[low])).isoformat(),
+        high=float(rates[high]),
+        high_date=date.fromordinal(int(days[high])).isoformat(),
+        mean=float(rates.mean()),
+        ma7=float(ma7[-1]) if len(ma7) else None,
+        ma30=float(ma30[-1]) if len(ma30) else None,
+        volatility=float(returns.std() * 100) if len(returns) else 0.0,
+    )
+
+
+def get_stats(currency, source, days=None):
+    """Статистика з пам'яті за останні days днів (None — за всю історію)."""
+    series = store.get(currency, source)
+    if series is None:
+        return None
+    start = date.today().toordinal() - days + 1 if days else None
+    return compute_stats(*series.window(start))
+
+
+def format_stats(currency, title, label, stats):
+    """Формує текст відповіді /stats."""
+    text = f"📊 {currency} ({title}) за {label}, точок: {stats.points}\n\n"
+    text += f"Курс: {stats.last:g} грн ({stats.last_date})\n"
+    text += f"Зміна: {stats.change_pct:+.2f}% (з {stats.first:g} на {stats.first_date})\n"
+    text += f"Мінімум: {stats.low:g} ({stats.low_date})\n"
+    text += f"Максимум: {stats.high:g} ({stats.high_date})\n"
+    text += f"Середній: {stats.mean:.4f}\n"
+    if stats.ma7 is not None:
+        text += f"Ковзне середнє 7 днів: {stats.ma7:.4f}\n"
+    if stats.ma30 is not None:
+        text += f"Ковзне середнє 30 днів: {stats.ma30:.4f}\n"
+    text += f"Волатильність: {stats.volatility:.2f}% на день"
+    return text